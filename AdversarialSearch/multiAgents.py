@@ -14,7 +14,7 @@
 
 from util import manhattanDistance
 from game import Directions
-import random, util
+import random, util, time
 
 from game import Agent
 
@@ -101,6 +101,93 @@ def scoreEvaluationFunction(currentGameState):
     """
     return currentGameState.getScore()
 
+class TranspositionTable:
+    """
+    A fixed-size transposition table for the multi-agent search agents.
+
+    Keys are (gameState, agentIndex) pairs, hashed with GameState.__hash__ to
+    one of size slots.  Each entry records how many plies below it were
+    searched, the value found, whether that value is exact or only a lower or
+    upper bound (alpha-beta), and the best action.  A slot is overwritten by a
+    search at least as deep, or by anything once the old entry is left over
+    from an earlier move.
+    """
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, size):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def newSearch(self):
+        "Call once per move, so entries from earlier moves age out first."
+        self.generation += 1
+
+    def slotIndex(self, key):
+        return hash(key) % self.size
+
+    def probe(self, slot, key):
+        "Returns (plies, value, flag, action) for key, or None."
+        self.probes += 1
+        entry = self.slots[slot]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        return None
+
+    def store(self, slot, key, plies, value, flag, action):
+        entry = self.slots[slot]
+        if entry is None or entry[5] != self.generation or plies >= entry[1] or entry[0] == key:
+            self.slots[slot] = (key, plies, value, flag, action, self.generation)
+
+class MoveOrdering:
+    """
+    Killer-move and history heuristics for alpha-beta.
+
+    Actions that caused a cutoff are remembered as killers for their ply and
+    earn a history score of plies^2 for their agent.  order() tries the
+    transposition table's best action first, then the killers, then the rest
+    by history score; ties keep getLegalActions order.
+    """
+    def __init__(self, killersPerPly=2):
+        self.killersPerPly = killersPerPly
+        self.killers = {}
+        self.history = util.Counter()
+
+    def newSearch(self):
+        "Forget killers and age the history scores between moves."
+        self.killers = {}
+        for key in self.history:
+            self.history[key] /= 2
+
+    def order(self, actions, index, plies, bestAction=None):
+        killers = self.killers.get(plies, [])
+        history = self.history
+        def rank(action):
+            if action == bestAction:
+                return (0, 0)
+            if action in killers:
+                return (1, killers.index(action))
+            return (2, -history[(index, action)])
+        return sorted(actions, key=rank)
+
+    def recordCutoff(self, index, plies, action):
+        killers = self.killers.setdefault(plies, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[self.killersPerPly:]
+        self.history[(index, action)] += plies * plies
+
+def parseFlag(value):
+    "Reads a boolean agent option, which arrives as a string from -a."
+    return str(value).lower() in ['1', 'true', 'yes']
+
+class SearchTimeout(Exception):
+    "Raised inside a search when an iterative-deepening move runs out of time."
+    pass
+
 class MultiAgentSearchAgent(Agent):
     """
     This class provides some common elements to all of your
@@ -114,12 +201,106 @@ class MultiAgentSearchAgent(Agent):
     Note: this is an abstract class: one that should not be instantiated.  It's
     only partially specified, and designed to be extended.  Agent (game.py)
     is another abstract class.
+
+    Two search enhancements are off by default so that the searches expand
+    exactly the textbook trees:
+      tableSize: number of transposition table slots (0 disables the table)
+      ordering:  use killer/history move ordering (alpha-beta only)
+    For example: -p AlphaBetaAgent -a depth=4,tableSize=200000,ordering=True
+
+    Setting timeBudget (seconds per move) replaces the fixed depth with
+    iterative deepening: depths 1, 2, ... maxDepth are searched until the
+    budget runs out, and the move from the deepest completed iteration is
+    played.  The reached depth and nodes/second are printed for every move.
+    For example: -p AlphaBetaAgent -a timeBudget=0.5,tableSize=200000
+
+    With compact=True the tree is searched over CompactGameStates (see
+    pacman.py), which are much cheaper to generate than full GameStates.
     """
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', tableSize = '0', ordering = 'False',
+                 timeBudget = '0', maxDepth = '50', compact = 'False'):
         self.index = 0 # Pacman is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        self.table = TranspositionTable(int(tableSize)) if int(tableSize) > 0 else None
+        self.ordering = MoveOrdering() if parseFlag(ordering) else None
+        self.timeBudget = float(timeBudget)
+        self.maxDepth = int(maxDepth)
+        self.compact = parseFlag(compact)
+        self.deadline = None
+        self.nodes = 0
+        self.previousPV = []
+        self.followPV = False
+        self.pvLine = {}
+
+    def getAction(self, gameState):
+        """
+        Searches to self.depth, or deepens iteratively if a time budget is set.
+        """
+        self.newSearch()
+        if self.compact:
+            gameState = gameState.compact()
+        if self.timeBudget > 0:
+            return self.iterativeDeepening(gameState)
+        return self.rootSearch(gameState)
+
+    def rootSearch(self, gameState):
+        "Returns the best action for gameState, searching to self.depth."
+        util.raiseNotDefined()
+
+    def newSearch(self):
+        "Prepares the table and move ordering for a new call to getAction."
+        if self.table is not None:
+            self.table.newSearch()
+        if self.ordering is not None:
+            self.ordering.newSearch()
+
+    def iterativeDeepening(self, gameState):
+        """
+        Runs rootSearch at increasing depths until self.timeBudget is spent.
+        The first iteration always completes, so there is always a move; later
+        iterations are abandoned (SearchTimeout) when the deadline passes.
+        """
+        start = time.time()
+        fixedDepth = self.depth
+        self.nodes = 0
+        self.previousPV = []
+        bestAction, reached = None, 0
+        try:
+            for depth in range(1, self.maxDepth + 1):
+                self.depth = depth
+                self.deadline = start + self.timeBudget if bestAction is not None else None
+                self.followPV = len(self.previousPV) > 0
+                self.pvLine = {}
+                bestAction = self.rootSearch(gameState)
+                reached = depth
+                self.previousPV = self.pvLine.get(0, [])
+                # The next iteration costs at least as much again, so don't start it
+                # unless it has a chance of finishing.
+                if time.time() - start > self.timeBudget / 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.depth = fixedDepth
+            self.deadline = None
+            self.followPV = False
+        elapsed = time.time() - start
+        rate = self.nodes / elapsed if elapsed > 0 else float('inf')
+        print('[%s] reached depth %d: %d nodes in %.2fs (%.0f nodes/sec)' % (
+            self.__class__.__name__, reached, self.nodes, elapsed, rate))
+        return bestAction
+
+    def visit(self):
+        "Counts a search node and aborts the search if the deadline has passed."
+        self.nodes += 1
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+
+    def remainingPlies(self, state, index, depth):
+        "The number of agent moves left before value() reaches self.depth."
+        return (self.depth - depth) * state.getNumAgents() - index
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
@@ -149,7 +330,9 @@ class MinimaxAgent(MultiAgentSearchAgent):
         gameState.isLose():
         Returns whether or not the game state is a losing state
         """
+        return MultiAgentSearchAgent.getAction(self, gameState)
 
+    def rootSearch(self, gameState):
         startingIndex = 0
         actions = gameState.getLegalActions(startingIndex)
         results = [(gameState.generateSuccessor(0, action), action) for action in actions]
@@ -157,9 +340,24 @@ class MinimaxAgent(MultiAgentSearchAgent):
         return action
 
     def value(self, state, index, depth):
+        self.visit()
         if depth == self.depth or state.isWin() or state.isLose():
             return self.evaluationFunction(state)
-        elif index == 0:
+        if self.table is None:
+            return self.searchValue(state, index, depth)
+        # Minimax values are exact, so any entry searched at least as deep will do.
+        key = (state, index)
+        slot = self.table.slotIndex(key)
+        plies = self.remainingPlies(state, index, depth)
+        entry = self.table.probe(slot, key)
+        if entry is not None and entry[0] >= plies:
+            return entry[1]
+        v = self.searchValue(state, index, depth)
+        self.table.store(slot, key, plies, v, TranspositionTable.EXACT, None)
+        return v
+
+    def searchValue(self, state, index, depth):
+        if index == 0:
             return self.maxValue(state, index, depth)
         else:
             return self.minValue(state, index, depth)
@@ -191,6 +389,9 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         """
         Returns the minimax action using self.depth and self.evaluationFunction
         """
+        return MultiAgentSearchAgent.getAction(self, gameState)
+
+    def rootSearch(self, gameState):
         # return self.maxValue(gameState, startingIndex, 0, -float('inf'), float('inf'))
         state = gameState
         index = 0
@@ -201,18 +402,43 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         nextIndex = (index+1) % state.getNumAgents()
         if nextIndex == 0:
             depth+=1
-        for action in state.getLegalActions(index):
+        self.pvLine[0] = []
+        for action in self.orderedActions(state, index, self.remainingPlies(state, index, 0), None, 0):
             successor = state.generateSuccessor(index, action)
+            self.pvLine[1] = []
             V = self.value(successor, nextIndex, depth, a, b)
+            self.followPV = False
             if v < V:
                 v = V
                 bestAction = action
+                self.pvLine[0] = [action] + self.pvLine[1]
             if v > b:
                 return v
             a = max(a,v)
         return bestAction
 
+    def orderedActions(self, state, index, plies, entry, ply):
+        """
+        The legal actions at a node, best candidates first.  While the search
+        is still following the previous iteration's principal variation, that
+        line's move at this ply goes first.
+        """
+        actions = state.getLegalActions(index)
+        pvAction = None
+        if self.followPV:
+            if ply < len(self.previousPV) and self.previousPV[ply] in actions:
+                pvAction = self.previousPV[ply]
+            else:
+                self.followPV = False
+        if self.ordering is not None:
+            bestAction = entry[3] if entry is not None else None
+            actions = self.ordering.order(actions, index, plies, bestAction)
+        if pvAction is not None:
+            actions = [pvAction] + [action for action in actions if action != pvAction]
+        return actions
+
     def value(self, state, index, depth, a, b):
+        self.visit()
         if depth == self.depth or state.isWin() or state.isLose():
             return self.evaluationFunction(state)
         elif index == 0:
@@ -220,30 +446,97 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         else:
             return self.minValue(state, index, depth, a, b)
 
+    def probe(self, state, index, depth, a, b):
+        """
+        Looks the node up in the transposition table.  Returns (slot, key,
+        entry, value), where value is not None if the stored bound already
+        decides this node for the window (a, b).
+        """
+        if self.table is None:
+            return None, None, None, None
+        key = (state, index)
+        slot = self.table.slotIndex(key)
+        entry = self.table.probe(slot, key)
+        if entry is not None and entry[0] >= self.remainingPlies(state, index, depth):
+            plies, v, flag, action = entry
+            if flag == TranspositionTable.EXACT or \
+               (flag == TranspositionTable.LOWER and v >= b) or \
+               (flag == TranspositionTable.UPPER and v <= a):
+                return slot, key, entry, v
+        return slot, key, entry, None
+
+    def record(self, slot, key, plies, v, a, b, bestAction):
+        "Stores v in the table, flagged by where it fell relative to (a, b)."
+        if self.table is None:
+            return
+        if v <= a:
+            flag = TranspositionTable.UPPER
+        elif v >= b:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.table.store(slot, key, plies, v, flag, bestAction)
+
     def maxValue(self, state, index, depth, a, b):
+        ply = depth * state.getNumAgents() + index
+        self.pvLine[ply] = []
+        slot, key, entry, stored = self.probe(state, index, depth, a, b)
+        if stored is not None:
+            return stored
+        plies = self.remainingPlies(state, index, depth)
+        alpha = a
+        bestAction = None
         v = -float('inf')
         nextIndex = (index+1) % state.getNumAgents()
         if nextIndex == 0:
             depth+=1
-        for action in state.getLegalActions(index):
+        for action in self.orderedActions(state, index, plies, entry, ply):
             successor = state.generateSuccessor(index, action)
-            v = max(v, self.value(successor, nextIndex, depth, a, b))
+            self.pvLine[ply + 1] = []
+            V = self.value(successor, nextIndex, depth, a, b)
+            self.followPV = False
+            if V > v:
+                v = V
+                bestAction = action
+                self.pvLine[ply] = [action] + self.pvLine[ply + 1]
             if v > b:
+                if self.ordering is not None:
+                    self.ordering.recordCutoff(index, plies, action)
+                self.record(slot, key, plies, v, alpha, b, bestAction)
                 return v
             a = max(a,v)
+        self.record(slot, key, plies, v, alpha, b, bestAction)
         return v
 
     def minValue(self, state, index, depth, a, b):
+        ply = depth * state.getNumAgents() + index
+        self.pvLine[ply] = []
+        slot, key, entry, stored = self.probe(state, index, depth, a, b)
+        if stored is not None:
+            return stored
+        plies = self.remainingPlies(state, index, depth)
+        beta = b
+        bestAction = None
         v = float('inf')
         nextIndex = (index+1) % state.getNumAgents()
         if nextIndex == 0:
             depth+=1
-        for action in state.getLegalActions(index):
+        for action in self.orderedActions(state, index, plies, entry, ply):
             successor = state.generateSuccessor(index, action)
-            v = min(v, self.value(successor, nextIndex, depth, a, b))
+            self.pvLine[ply + 1] = []
+            V = self.value(successor, nextIndex, depth, a, b)
+            self.followPV = False
+            if V < v:
+                v = V
+                bestAction = action
+                self.pvLine[ply] = [action] + self.pvLine[ply + 1]
             if v < a:
+                if self.ordering is not None:
+                    self.ordering.recordCutoff(index, plies, action)
+                self.record(slot, key, plies, v, a, beta, bestAction)
                 return v
             b = min(b,v)
+        self.record(slot, key, plies, v, a, beta, bestAction)
         return v
 
 class ExpectimaxAgent(MultiAgentSearchAgent):
@@ -258,6 +551,9 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         All ghosts should be modeled as choosing uniformly at random from their
         legal moves.
         """
+        return MultiAgentSearchAgent.getAction(self, gameState)
+
+    def rootSearch(self, gameState):
         startingIndex = 0
         actions = gameState.getLegalActions(startingIndex)
         results = [(gameState.generateSuccessor(0, action), action) for action in actions]
@@ -265,9 +561,24 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         return action
 
     def value(self, state, index, depth):
+        self.visit()
         if depth == self.depth or state.isWin() or state.isLose():
             return self.evaluationFunction(state)
-        elif index == 0:
+        if self.table is None:
+            return self.searchValue(state, index, depth)
+        # Expectimax values are exact, so any entry searched at least as deep will do.
+        key = (state, index)
+        slot = self.table.slotIndex(key)
+        plies = self.remainingPlies(state, index, depth)
+        entry = self.table.probe(slot, key)
+        if entry is not None and entry[0] >= plies:
+            return entry[1]
+        v = self.searchValue(state, index, depth)
+        self.table.store(slot, key, plies, v, TranspositionTable.EXACT, None)
+        return v
+
+    def searchValue(self, state, index, depth):
+        if index == 0:
             return self.maxValue(state, index, depth)
         else:
             return self.expValue(state, index, depth)
@@ -160,6 +160,8 @@ def run(lay, layName, pac, ghosts, disp, nGames=1, name='games'):
 
 class GradingAgent(Agent):
     def __init__(self, seed, studentAgent, optimalActions, altDepthActions, partialPlyBugActions):
+        # count explored states to compare against the reference agents
+        GameState.setExploredTracking(True)
         # save student agent and actions of refernce agents
         self.studentAgent = studentAgent
         self.optimalActions = optimalActions
@@ -241,6 +243,8 @@ class GradingAgent(Agent):
 
 class PolyAgent(Agent):
     def __init__(self, seed, multiAgents, ourPacOptions, depth):
+        # count explored states of our pacman agents
+        GameState.setExploredTracking(True)
         # prepare our pacman agents
         solutionAgents, alternativeDepthAgents, partialPlyBugAgents = self.construct_our_pacs(
             multiAgents, ourPacOptions)
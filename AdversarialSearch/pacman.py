@@ -43,6 +43,9 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import AgentState
+from game import Configuration
+from game import Grid
 from util import nearestPoint
 from util import manhattanDistance
 import util
@@ -77,8 +80,17 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
+    # static variable keeps track of which states have had successors generated.
+    # Tracking is off unless enabled with setExploredTracking, since the set
+    # would otherwise hold on to every state ever generated.
     explored = set()
+    trackExplored = False
+
+    def setExploredTracking(enabled=True):
+        GameState.trackExplored = enabled
+        if not enabled:
+            GameState.explored = set()
+    setExploredTracking = staticmethod(setExploredTracking)
 
     def getAndResetExplored():
         tmp = GameState.explored.copy()
@@ -129,8 +141,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.trackExplored:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions(self):
@@ -262,6 +275,262 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+    def compact(self):
+        """
+        Returns a CompactGameState for fast game-tree search from this state.
+        """
+        return CompactGameState(self)
+
+class CompactGameState:
+    """
+    A lightweight stand-in for GameState when searching game trees.
+
+    It holds only what the rules need -- agent positions and directions,
+    scared timers, the food as a bitmask (bit x * height + y), capsules and
+    the score -- in tuples and ints that are never modified in place.
+    generateSuccessor therefore shares everything it does not change with
+    its parent instead of copying AgentStates, Configurations and the food
+    Grid, and it never touches GameState.explored.
+
+    For depth-first searches, apply(agentIndex, action) moves this state in
+    place and undo() takes the last move back, so a whole tree can be walked
+    with one object.  The query methods mirror GameState's, so evaluation
+    functions written for GameState work unchanged.
+
+    Create one from a real state with gameState.compact().
+    """
+
+    def __init__(self, gameState):
+        data = gameState.data
+        self.layout = data.layout
+        self.walls = data.layout.walls
+        self.height = self.walls.height
+        agentStates = data.agentStates
+        self.starts = tuple((s.start.pos, s.start.direction) for s in agentStates)
+        self.positions = tuple(s.configuration.pos for s in agentStates)
+        self.directions = tuple(s.configuration.direction for s in agentStates)
+        self.scaredTimers = tuple(s.scaredTimer for s in agentStates)
+        food = 0
+        for x, y in data.food.asList():
+            food |= 1 << (x * self.height + y)
+        self.food = food
+        self.numFood = data.food.count()
+        self.capsules = tuple(data.capsules)
+        self.score = data.score
+        self.win = data._win
+        self.lose = data._lose
+        self.history = []
+
+    def copy(self):
+        "Returns a state sharing all data with this one, with no undo history."
+        state = CompactGameState.__new__(CompactGameState)
+        state.__dict__.update(self.__dict__)
+        state.history = []
+        return state
+
+    ######################
+    # GameState methods  #
+    ######################
+
+    def getLegalActions(self, agentIndex=0):
+        if self.win or self.lose:
+            return []
+        possible = self._possibleActions(agentIndex)
+        if agentIndex == 0:
+            return possible
+        if Directions.STOP in possible:
+            possible.remove(Directions.STOP)
+        reverse = Actions.reverseDirection(self.directions[agentIndex])
+        if reverse in possible and len(possible) > 1:
+            possible.remove(reverse)
+        return possible
+
+    def getLegalPacmanActions(self):
+        return self.getLegalActions(0)
+
+    def generateSuccessor(self, agentIndex, action):
+        state = self.copy()
+        state.apply(agentIndex, action)
+        state.history = []
+        return state
+
+    def generatePacmanSuccessor(self, action):
+        return self.generateSuccessor(0, action)
+
+    def getNumAgents(self):
+        return len(self.positions)
+
+    def getScore(self):
+        return float(self.score)
+
+    def isWin(self):
+        return self.win
+
+    def isLose(self):
+        return self.lose
+
+    def getPacmanPosition(self):
+        return self.positions[0]
+
+    def getGhostPosition(self, agentIndex):
+        if agentIndex == 0:
+            raise Exception("Pacman's index passed to getGhostPosition")
+        return self.positions[agentIndex]
+
+    def getGhostPositions(self):
+        return list(self.positions[1:])
+
+    def getScaredTimers(self):
+        "The scared timer of every ghost, in agent order."
+        return list(self.scaredTimers[1:])
+
+    def getGhostStates(self):
+        "Builds AgentStates for the ghosts; prefer getGhostPositions/getScaredTimers."
+        states = []
+        for index in range(1, len(self.positions)):
+            start = Configuration(*self.starts[index])
+            ghostState = AgentState(start, False)
+            ghostState.configuration = Configuration(self.positions[index], self.directions[index])
+            ghostState.scaredTimer = self.scaredTimers[index]
+            states.append(ghostState)
+        return states
+
+    def getCapsules(self):
+        return list(self.capsules)
+
+    def getNumFood(self):
+        return self.numFood
+
+    def hasFood(self, x, y):
+        return (self.food >> (x * self.height + y)) & 1 == 1
+
+    def getFoodList(self):
+        "The positions of the remaining food, in Grid.asList order."
+        food, height = self.food, self.height
+        foodList = []
+        while food:
+            low = food & -food
+            index = low.bit_length() - 1
+            foodList.append((index // height, index % height))
+            food ^= low
+        return foodList
+
+    def getFood(self):
+        "Builds a food Grid; prefer hasFood or getFoodList in inner loops."
+        grid = Grid(self.walls.width, self.height)
+        for x, y in self.getFoodList():
+            grid[x][y] = True
+        return grid
+
+    def getWalls(self):
+        return self.walls
+
+    def hasWall(self, x, y):
+        return self.walls[x][y]
+
+    def __eq__(self, other):
+        return isinstance(other, CompactGameState) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return (self.positions, self.directions, self.scaredTimers, self.food, self.capsules, self.score)
+
+    ###################
+    # Apply and undo  #
+    ###################
+
+    def apply(self, agentIndex, action):
+        """
+        Moves agentIndex by action in place, following the same rules as
+        GameState.generateSuccessor.  The previous state is kept for undo().
+        """
+        if self.win or self.lose:
+            raise Exception('Can\'t generate a successor of a terminal state.')
+        if action not in self.getLegalActions(agentIndex):
+            raise Exception("Illegal action " + str(action))
+        self.history.append((self.positions, self.directions, self.scaredTimers,
+                             self.food, self.numFood, self.capsules, self.score,
+                             self.win, self.lose))
+
+        positions = list(self.positions)
+        directions = list(self.directions)
+        scaredTimers = list(self.scaredTimers)
+        scoreChange = 0
+
+        x, y = positions[agentIndex]
+        if agentIndex == 0:
+            speed = PacmanRules.PACMAN_SPEED
+        else:
+            speed = GhostRules.GHOST_SPEED
+            if scaredTimers[agentIndex] > 0:
+                speed /= 2.0
+        dx, dy = Actions.directionToVector(action, speed)
+        positions[agentIndex] = (x + dx, y + dy)
+        if action != Directions.STOP:
+            directions[agentIndex] = action
+
+        if agentIndex == 0:
+            # Eat
+            nearest = nearestPoint(positions[0])
+            if manhattanDistance(nearest, positions[0]) <= 0.5:
+                bit = 1 << (nearest[0] * self.height + nearest[1])
+                if self.food & bit:
+                    scoreChange += 10
+                    self.food &= ~bit
+                    self.numFood -= 1
+                    if self.numFood == 0 and not self.lose:
+                        scoreChange += 500
+                        self.win = True
+                if nearest in self.capsules:
+                    capsules = list(self.capsules)
+                    capsules.remove(nearest)
+                    self.capsules = tuple(capsules)
+                    for index in range(1, len(scaredTimers)):
+                        scaredTimers[index] = SCARED_TIME
+            scoreChange -= TIME_PENALTY
+            ghosts = range(1, len(positions))
+        else:
+            timer = scaredTimers[agentIndex]
+            if timer == 1:
+                positions[agentIndex] = nearestPoint(positions[agentIndex])
+            scaredTimers[agentIndex] = max(0, timer - 1)
+            ghosts = [agentIndex]
+
+        # Resolve collisions
+        pacmanPosition = positions[0]
+        for index in ghosts:
+            if GhostRules.canKill(pacmanPosition, positions[index]):
+                if scaredTimers[index] > 0:
+                    scoreChange += 200
+                    positions[index], directions[index] = self.starts[index]
+                    scaredTimers[index] = 0
+                elif not self.win:
+                    scoreChange -= 500
+                    self.lose = True
+
+        self.positions = tuple(positions)
+        self.directions = tuple(directions)
+        self.scaredTimers = tuple(scaredTimers)
+        self.score += scoreChange
+
+    def undo(self):
+        "Takes back the most recent apply()."
+        (self.positions, self.directions, self.scaredTimers, self.food, self.numFood,
+         self.capsules, self.score, self.win, self.lose) = self.history.pop()
+
+    def _possibleActions(self, agentIndex):
+        "Actions.getPossibleActions without building a Configuration."
+        x, y = self.positions[agentIndex]
+        x_int, y_int = int(x + 0.5), int(y + 0.5)
+        # In between grid points, all agents must continue straight
+        if (abs(x - x_int) + abs(y - y_int) > Actions.TOLERANCE):
+            return [self.directions[agentIndex]]
+        walls = self.walls
+        return [dir for dir, (dx, dy) in Actions._directionsAsList if not walls[x_int + dx][y_int + dy]]
+
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -19,9 +19,22 @@ caches the shortest path between any two points in the maze.
 Example:
 distancer = Distancer(gameState.data.layout)
 distancer.getDistance( (1,1), (10,10) )
+
+All-pairs distances are computed with one BFS per open cell and kept in a
+DistanceTable.  When NumPy is available the table is an int16 matrix that is
+also saved to disk, keyed by a hash of the wall layout, so later games on the
+same map memory-map it instead of recomputing it.  Set the environment
+variable PACMAN_DISTANCE_CACHE to choose the cache directory, or to an empty
+string to disable the disk cache.
 """
 
 import sys, time, random
+import collections, hashlib, os, tempfile
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
 
 class Distancer:
   def __init__(self, layout, default = 10000):
@@ -55,11 +68,10 @@ class Distancer:
     return bestDistance
 
   def getDistanceOnGrid(self, pos1, pos2):
-    key = (pos1, pos2)
-    if key in self._distances:
-      return self._distances[key]
-    else:
-      raise Exception("Positions not in grid: " + str(key))
+    distance = self._distances.getDistance(pos1, pos2)
+    if distance is None:
+      raise Exception("Positions not in grid: " + str((pos1, pos2)))
+    return distance
 
   def isReadyForMazeDistance(self):
     return self._distances != None
@@ -100,58 +112,139 @@ class DistanceCalculator:
     global distanceMap
 
     if self.layout.walls not in distanceMap:
-      distances = computeDistances(self.layout)
+      distances = loadOrComputeDistances(self.layout)
       distanceMap[self.layout.walls] = distances
     else:
       distances = distanceMap[self.layout.walls]
 
     self.distancer._distances = distances
 
+class DistanceTable:
+  """
+  All-pairs maze distances between the open cells of a layout.
+
+  cellIds maps each open (x,y) position to a row/column of matrix, which is
+  an int16 NumPy array (possibly memory-mapped) or, without NumPy, a list of
+  lists.  Unreachable pairs are stored as -1.
+  """
+  def __init__(self, cells, matrix):
+    self.cells = cells
+    self.cellIds = dict((cell, i) for i, cell in enumerate(cells))
+    self.matrix = matrix
+    self._isArray = np is not None and isinstance(matrix, np.ndarray)
+
+  def getDistance(self, pos1, pos2):
+    """
+    Returns the maze distance between two open cells, sys.maxsize if they are
+    not connected, or None if either is not an open cell.
+    """
+    i = self.cellIds.get(pos1)
+    j = self.cellIds.get(pos2)
+    if i is None or j is None:
+      return None
+    if self._isArray:
+      distance = self.matrix.item(i, j)
+    else:
+      distance = self.matrix[i][j]
+    if distance < 0:
+      return sys.maxsize
+    return distance
+
+  def __contains__(self, key):
+    pos1, pos2 = key
+    return pos1 in self.cellIds and pos2 in self.cellIds
+
+  def __getitem__(self, key):
+    distance = self.getDistance(*key)
+    if distance is None:
+      raise KeyError(key)
+    return distance
+
 def computeDistances(layout):
-    "Runs UCS to all other positions from each position"
-    distances = {}
-    allNodes = layout.walls.asList(False)
-    for source in allNodes:
-        dist = {}
-        closed = {}
-        for node in allNodes:
-            dist[node] = sys.maxsize
-        import util
-        queue = util.PriorityQueue()
-        queue.push(source, 0)
+    "Runs BFS to all other positions from each position"
+    cells = layout.walls.asList(False)
+    cellIds = dict((cell, i) for i, cell in enumerate(cells))
+    neighbors = []
+    for x, y in cells:
+        adjacent = []
+        for other in [(x,y+1), (x,y-1), (x+1,y), (x-1,y)]:
+            if other in cellIds:
+                adjacent.append(cellIds[other])
+        neighbors.append(adjacent)
+
+    n = len(cells)
+    if np is not None:
+        matrix = np.empty((n, n), dtype=np.int16)
+    else:
+        matrix = []
+    for source in range(n):
+        dist = [-1] * n
         dist[source] = 0
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
-            if not layout.isWall((x,y+1)):
-                adjacent.append((x,y+1))
-            if not layout.isWall((x,y-1)):
-                adjacent.append((x,y-1) )
-            if not layout.isWall((x+1,y)):
-                adjacent.append((x+1,y) )
-            if not layout.isWall((x-1,y)):
-                adjacent.append((x-1,y))
-            for other in adjacent:
-                if not other in dist:
-                    continue
-                oldDist = dist[other]
-                newDist = nodeDist+1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
-    return distances
+        queue = collections.deque([source])
+        while queue:
+            node = queue.popleft()
+            nextDist = dist[node] + 1
+            for other in neighbors[node]:
+                if dist[other] < 0:
+                    dist[other] = nextDist
+                    queue.append(other)
+        if np is not None:
+            matrix[source, :] = dist
+        else:
+            matrix.append(dist)
+    return DistanceTable(cells, matrix)
+
+def _cacheDirectory():
+    directory = os.environ.get('PACMAN_DISTANCE_CACHE')
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'pacman_distances')
+    return directory
+
+def layoutKey(layout):
+    "A hash of the wall layout, used to name its cached distance table."
+    return hashlib.sha1(str(layout.walls).encode()).hexdigest()
+
+def loadOrComputeDistances(layout):
+    """
+    Returns the DistanceTable for layout, memory-mapping it from the disk cache
+    if a previous game already computed it.  Without NumPy, or with the cache
+    disabled, the table is simply computed.
+    """
+    directory = _cacheDirectory()
+    if np is None or not directory:
+        return computeDistances(layout)
+
+    cells = layout.walls.asList(False)
+    path = os.path.join(directory, layoutKey(layout) + '.npy')
+    try:
+        matrix = np.load(path, mmap_mode='r')
+        if matrix.shape == (len(cells), len(cells)) and matrix.dtype == np.int16:
+            return DistanceTable(cells, matrix)
+    except (IOError, OSError, ValueError):
+        pass
+
+    table = computeDistances(layout)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Write under a unique name and rename, so concurrent games never
+        # read a partially written file.
+        handle, tmpPath = tempfile.mkstemp(suffix='.npy', dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.save(f, table.matrix)
+            os.replace(tmpPath, path)
+        finally:
+            # Only left behind if the write or the rename failed
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+    except (IOError, OSError):
+        pass
+    return table
 
 
 def getDistanceOnGrid(distances, pos1, pos2):
-    key = (pos1, pos2)
-    if key in distances:
-      return distances[key]
-    return 100000
-
+    distance = distances.getDistance(pos1, pos2)
+    if distance is None:
+      return 100000
+    return distance
@@ -38,24 +38,49 @@ SONAR_MAX = (SONAR_NOISE_RANGE - 1)/2
 SONAR_NOISE_VALUES = [i - SONAR_MAX for i in range(SONAR_NOISE_RANGE)]
 SONAR_DENOMINATOR = 2 ** SONAR_MAX  + 2 ** (SONAR_MAX + 1) - 2.0
 SONAR_NOISE_PROBS = [2 ** (SONAR_MAX-abs(v)) / SONAR_DENOMINATOR  for v in SONAR_NOISE_VALUES]
+SONAR_NOISE = util.CompiledDistribution(SONAR_NOISE_VALUES, util.normalize(SONAR_NOISE_PROBS))
 
 def getNoisyDistance(pos1, pos2):
     if pos2[1] == 1: return None
     distance = util.manhattanDistance(pos1, pos2)
-    return max(0, distance + util.sample(SONAR_NOISE_PROBS, SONAR_NOISE_VALUES))
+    return max(0, distance + SONAR_NOISE.sample())
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+observationTable = []
+def getObservationTable(maxDistance):
+    """
+    Returns a dense table of P( noisyDistance | trueDistance ), indexed as
+    table[noisyDistance][trueDistance], covering every noisy and true
+    distance up to maxDistance.  The table is a NumPy array when NumPy is
+    available (so a row can be gathered with an array of true distances) and
+    a list of lists otherwise.  It is built once and only grows.
+    """
+    global observationTable
+    maxDistance = int(maxDistance)
+    if len(observationTable) <= maxDistance:
+        size = max(maxDistance + 1, 2 * len(observationTable))
+        width = size + int(SONAR_MAX) + 1
+        rows = []
+        for noisyDistance in range(size):
+            row = [0.0] * width
+            for error, prob in zip(SONAR_NOISE_VALUES, SONAR_NOISE_PROBS):
+                row[int(max(1, noisyDistance - error))] += prob
+            rows.append(row)
+        observationTable = np.array(rows) if np is not None else rows
+    return observationTable
 
-observationDistributions = {}
 def getObservationProbability(noisyDistance, trueDistance):
     """
     Returns the probability P( noisyDistance | trueDistance ).
     """
-    global observationDistributions
-    if noisyDistance not in observationDistributions:
-        distribution = util.Counter()
-        for error , prob in zip(SONAR_NOISE_VALUES, SONAR_NOISE_PROBS):
-            distribution[max(1, noisyDistance - error)] += prob
-        observationDistributions[noisyDistance] = distribution
-    return observationDistributions[noisyDistance][trueDistance]
+    if trueDistance > noisyDistance + SONAR_MAX:
+        return 0.0
+    table = getObservationTable(max(noisyDistance, trueDistance))
+    return float(table[int(noisyDistance)][int(trueDistance)])
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
@@ -36,6 +36,11 @@ class GhostAgent( Agent ):
 
 class RandomGhost( GhostAgent ):
     "A ghost that chooses a legal action uniformly at random."
+    # getDistribution never looks at the other ghosts, so inference modules
+    # may share its transition model across their positions.  Ghosts that do
+    # not declare this are assumed to depend on the other ghosts.
+    usesOtherGhosts = False
+
     def getDistribution( self, state ):
         dist = util.Counter()
         for a in state.getLegalActions( self.index ): dist[a] = 1.0
@@ -44,6 +49,8 @@ class RandomGhost( GhostAgent ):
 
 class DirectionalGhost( GhostAgent ):
     "A ghost that prefers to rush Pacman, or flee when scared."
+    usesOtherGhosts = False
+
     def __init__( self, index, prob_attack=0.8, prob_scaredFlee=0.8 ):
         self.index = index
         self.prob_attack = prob_attack
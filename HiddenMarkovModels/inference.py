@@ -18,16 +18,21 @@ import busters
 import game
 
 from functools import reduce
-from util import manhattanDistance, raiseNotDefined
+from util import manhattanDistance, raiseNotDefined, CompilingDict
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-class DiscreteDistribution(dict):
+
+class DiscreteDistribution(CompilingDict):
     """
     A DiscreteDistribution models belief distributions and weight distributions
     over a finite set of discrete keys.
     """
     def __getitem__(self, key):
-        self.setdefault(key, 0)
+        dict.setdefault(self, key, 0)
         return dict.__getitem__(self, key)
 
     def copy(self):
@@ -82,10 +87,12 @@ class DiscreteDistribution(dict):
             self[k] = self[k]/t
 
 
-    def sample(self):
+    def sample(self, k=None):
         """
         Draw a random sample from the distribution and return the key, weighted
-        by the values associated with each key.
+        by the values associated with each key.  With k, return a list of k
+        samples drawn in one call.  The distribution is compiled once and
+        reused until it is next modified.
 
         >>> dist = DiscreteDistribution()
         >>> dist['a'] = 1
@@ -102,13 +109,11 @@ class DiscreteDistribution(dict):
         0.4
         >>> round(samples.count('d') * 1.0/N, 1)
         0.0
+        >>> samples = dist.sample(int(N))
+        >>> round(samples.count('b') * 1.0/N, 1)
+        0.4
         """
-        r = self.total() * random.random()
-        i = 0
-        for k,v in self.items():
-            i+=v
-            if i >= r:
-                return k
+        return self.compile().sample(k)
 
 
 class InferenceModule:
@@ -185,6 +190,66 @@ class InferenceModule:
         trueDistance = manhattanDistance(ghostPosition, pacmanPosition)
         return busters.getObservationProbability(noisyDistance, trueDistance)
 
+    def initializeDistances(self):
+        """
+        Prepare the per-Pacman-position distance cache over self.allPositions.
+        """
+        self.trueDistances = {}
+        if np is not None:
+            coordinates = np.array(self.allPositions, dtype=int).reshape(-1, 2)
+            self.xs, self.ys = coordinates[:, 0], coordinates[:, 1]
+
+    def getTrueDistances(self, pacmanPosition):
+        """
+        Return the Manhattan distances from pacmanPosition to each entry of
+        self.allPositions, computed once per Pacman position.
+        """
+        if pacmanPosition not in self.trueDistances:
+            px, py = pacmanPosition
+            if np is not None:
+                distances = abs(self.xs - px) + abs(self.ys - py)
+            else:
+                distances = [abs(x - px) + abs(y - py) for x, y in self.allPositions]
+            self.trueDistances[pacmanPosition] = distances
+        return self.trueDistances[pacmanPosition]
+
+    def getObservationVector(self, noisyDistance, pacmanPosition, jailPosition):
+        """
+        Return the list of getObservationProb values for every entry of
+        self.allPositions, gathered in one step from the dense
+        busters.getObservationTable.
+        """
+        if noisyDistance == None:
+            return [float(g == jailPosition) for g in self.allPositions]
+        distances = self.getTrueDistances(pacmanPosition)
+        if np is not None:
+            table = busters.getObservationTable(max(noisyDistance, distances.max()))
+            weights = table[int(noisyDistance)][distances].tolist()
+        else:
+            row = busters.getObservationTable(max(noisyDistance, max(distances)))[int(noisyDistance)]
+            weights = [row[d] for d in distances]
+        for i, g in enumerate(self.allPositions):
+            if g == jailPosition:
+                weights[i] = 0.0
+        return weights
+
+    def getTransitionKey(self, gameState, agent=None):
+        """
+        Return a key identifying everything the ghost's transition model can
+        depend on besides the ghost's own position: Pacman's position and, for
+        agents that react to the other ghosts, their positions too.  Agents
+        that do not declare usesOtherGhosts are assumed to depend on them.
+        """
+        if agent == None:
+            agent = self.ghostAgent
+        pacmanPosition = gameState.getPacmanPosition()
+        if not getattr(agent, 'usesOtherGhosts', True):
+            return (pacmanPosition, type(agent))
+        others = tuple(None if s is None else s.getPosition()
+                       for i, s in enumerate(gameState.data.agentStates)
+                       if i != 0 and i != agent.index)
+        return (pacmanPosition, type(agent), others)
+
     def setGhostPosition(self, gameState, ghostPosition, index):
         """
         Set the position of the ghost for this inference module to the specified
@@ -228,6 +293,7 @@ class InferenceModule:
         """
         self.legalPositions = [p for p in gameState.getWalls().asList(False) if p[1] > 1]
         self.allPositions = self.legalPositions + [self.getJailPosition()]
+        self.initializeDistances()
         self.initializeUniformly(gameState)
 
     ######################################
@@ -293,8 +359,9 @@ class ExactInference(InferenceModule):
 
         p = gameState.getPacmanPosition()
         j = self.getJailPosition()
-        for g in self.allPositions:
-            self.beliefs[g] *= self.getObservationProb(observation, p, g, j)
+        weights = self.getObservationVector(observation, p, j)
+        for g, w in zip(self.allPositions, weights):
+            self.beliefs[g] *= w
         self.beliefs.normalize()
 
     def elapseTime(self, gameState):
@@ -319,6 +386,165 @@ class ExactInference(InferenceModule):
         return self.beliefs
 
 
+class TransitionRows:
+    """
+    A partially built sparse transition matrix over position indices, stored
+    as coordinate lists plus the set of rows that have been filled in.
+    """
+    def __init__(self):
+        self.covered = set()
+        self.rows, self.cols, self.probs = [], [], []
+        self.cached = None
+        self.sampler = None
+
+    def addRow(self, row, entries):
+        self.covered.add(row)
+        for col, prob in entries:
+            self.rows.append(row)
+            self.cols.append(col)
+            self.probs.append(prob)
+        self.cached = self.sampler = None
+
+    def arrays(self):
+        """
+        Return the matrix as parallel arrays (rows, cols, probs).
+        """
+        if self.cached is None:
+            self.cached = (np.array(self.rows, dtype=int), np.array(self.cols, dtype=int),
+                           np.array(self.probs, dtype=float))
+        return self.cached
+
+    def sample(self, rows, uniforms):
+        """
+        Sample a successor column for each entry of rows, using the matching
+        entry of uniforms in [0, 1).  Each row's entries are laid out as a CDF
+        shifted by the row index, so one searchsorted call samples them all.
+        """
+        if self.sampler is None:
+            r, c, p = self.arrays()
+            order = np.argsort(r, kind='stable')
+            r, c, p = r[order], c[order], p[order]
+            starts = np.flatnonzero(np.append(True, r[1:] != r[:-1]))
+            lengths = np.diff(np.append(starts, len(r)))
+            ends = starts + lengths - 1
+            cumulative = np.cumsum(p)
+            offsets = cumulative[starts] - p[starts]
+            before = np.repeat(offsets, lengths)
+            totals = np.repeat(cumulative[ends] - offsets, lengths)
+            keys = r + (cumulative - before) / totals
+            keys[ends] = r[ends] + 1.0
+            self.sampler = (keys, c)
+        keys, cols = self.sampler
+        return cols[np.searchsorted(keys, rows + uniforms, side='right')]
+
+
+class VectorizedInferenceModule(InferenceModule):
+    """
+    Shared machinery for inference modules that keep their state in NumPy
+    arrays indexed by position.  Positions are indexed once in initialize,
+    and the ghost's transition model is compiled into TransitionRows cached
+    by getTransitionKey.
+    """
+    maxCachedTransitions = 1024
+
+    def initialize(self, gameState):
+        if np is None:
+            raise ImportError('%s requires numpy' % self.__class__.__name__)
+        self.legalPositions = [p for p in gameState.getWalls().asList(False) if p[1] > 1]
+        self.allPositions = self.legalPositions + [self.getJailPosition()]
+        self.positions = list(self.allPositions)
+        self.positionIds = dict((p, i) for i, p in enumerate(self.positions))
+        self.initializeDistances()
+        self.transitionCache = {}
+        self.initializeUniformly(gameState)
+
+    def getPositionId(self, pos):
+        """
+        Return the index of pos, extending the index if a successor lands
+        outside allPositions.
+        """
+        if pos not in self.positionIds:
+            self.positionIds[pos] = len(self.positions)
+            self.positions.append(pos)
+        return self.positionIds[pos]
+
+    def getObservationWeights(self, observation, pacmanPosition):
+        """
+        Return P(observation | ghost position) for every indexed position.
+        Positions outside allPositions keep their weight, as they do in
+        ExactInference.observeUpdate.
+        """
+        weights = np.ones(len(self.positions))
+        weights[:len(self.allPositions)] = self.getObservationVector(
+            observation, pacmanPosition, self.getJailPosition())
+        return weights
+
+    def getTransitionRows(self, gameState, support):
+        """
+        Return the TransitionRows for the current transition key, with every
+        position index in support filled in.  Rows are built lazily and kept
+        for the next time the same key comes up.
+        """
+        key = self.getTransitionKey(gameState)
+        if key not in self.transitionCache:
+            if len(self.transitionCache) >= self.maxCachedTransitions:
+                self.transitionCache.clear()
+            self.transitionCache[key] = TransitionRows()
+        matrix = self.transitionCache[key]
+        for i in support:
+            if i not in matrix.covered:
+                newPosDist = self.getPositionDistribution(gameState, self.positions[i])
+                matrix.addRow(i, [(self.getPositionId(newPos), prob)
+                                  for newPos, prob in newPosDist.items()])
+        return matrix
+
+    def getRandomState(self):
+        """
+        Return a NumPy random generator seeded from the random module, so that
+        games run with a fixed seed stay reproducible.
+        """
+        return np.random.RandomState(random.getrandbits(32))
+
+
+class VectorizedExactInference(VectorizedInferenceModule):
+    """
+    Exact inference over a NumPy belief vector.  A time step is a single
+    weighted bincount over the cached sparse transition matrix instead of a
+    rebuild of every successor distribution.  Beliefs are identical to
+    ExactInference up to floating point error.
+
+    Select it with -a inference=VectorizedExactInference.
+    """
+    def initializeUniformly(self, gameState):
+        self.beliefs = np.zeros(len(self.positions))
+        self.beliefs[:len(self.legalPositions)] = 1.0 / len(self.legalPositions)
+
+    def observeUpdate(self, observation, gameState):
+        weights = self.getObservationWeights(observation, gameState.getPacmanPosition())
+        self.beliefs = self.beliefs * weights
+        self.normalizeBeliefs()
+
+    def elapseTime(self, gameState):
+        # Like ExactInference, only mass on allPositions is carried forward.
+        support = np.flatnonzero(self.beliefs[:len(self.allPositions)] > 0).tolist()
+        rows, cols, probs = self.getTransitionRows(gameState, support).arrays()
+        self.beliefs = np.bincount(cols, weights=self.beliefs[rows] * probs,
+                                   minlength=len(self.positions))
+        self.normalizeBeliefs()
+
+    def normalizeBeliefs(self):
+        total = self.beliefs.sum()
+        if total != 0:
+            self.beliefs /= total
+
+    def getBeliefDistribution(self):
+        beliefs = DiscreteDistribution()
+        for pos, prob in zip(self.positions, self.beliefs.tolist()):
+            if prob > 0:
+                beliefs[pos] = prob
+        return beliefs
+
+
 class ParticleFilter(InferenceModule):
     """
     A particle filter for approximately tracking a single ghost.
@@ -364,8 +590,9 @@ class ParticleFilter(InferenceModule):
         j = self.getJailPosition()
         beliefDist = self.getBeliefDistribution()
 
-        for g in self.legalPositions:
-            beliefDist[g] *= self.getObservationProb(observation, p, g, j)
+        weights = self.getObservationVector(observation, p, j)
+        for g, w in zip(self.legalPositions, weights):
+            beliefDist[g] *= w
         if beliefDist.total() == 0:
             self.initializeUniformly(gameState)
         else:
@@ -404,6 +631,73 @@ class ParticleFilter(InferenceModule):
         return d
 
 
+class ArrayParticleFilter(VectorizedInferenceModule):
+    """
+    A particle filter whose particles are an integer array of position
+    indices.  Observations reweight the occupied cells in one vector product
+    and are followed by O(N) systematic resampling; time steps sample every
+    particle's successor in one batch from the cached per-cell CDFs.
+
+    Select it with -a inference=ArrayParticleFilter.
+    """
+    def __init__(self, ghostAgent, numParticles=300):
+        InferenceModule.__init__(self, ghostAgent)
+        self.setNumParticles(numParticles)
+
+    def setNumParticles(self, numParticles):
+        self.numParticles = numParticles
+
+    def initializeUniformly(self, gameState):
+        """
+        Spread the particles evenly (not randomly) over the legal positions.
+        """
+        self.particles = np.arange(self.numParticles) % len(self.legalPositions)
+
+    def observeUpdate(self, observation, gameState):
+        """
+        Weight each occupied cell by its particle count times the observation
+        likelihood, then resample.  When every particle receives zero weight
+        the particles are reinitialized uniformly.
+        """
+        weights = self.getObservationWeights(observation, gameState.getPacmanPosition())
+        weights *= np.bincount(self.particles, minlength=len(self.positions))
+        if weights.sum() == 0:
+            self.initializeUniformly(gameState)
+        else:
+            self.particles = self.resample(weights)
+
+    def resample(self, weights):
+        """
+        Systematic (low-variance) resampling: a single uniform offset places
+        numParticles evenly spaced pointers on the cumulative weights, so each
+        cell receives the floor or ceiling of its expected count.
+        """
+        cells = np.flatnonzero(weights)
+        cumulative = np.cumsum(weights[cells])
+        cumulative *= self.numParticles / cumulative[-1]
+        cumulative[-1] = self.numParticles
+        offset = self.getRandomState().random_sample()
+        edges = np.clip(np.ceil(cumulative - offset), 0, self.numParticles).astype(int)
+        return np.repeat(cells, np.diff(np.append(0, edges)))
+
+    def elapseTime(self, gameState):
+        """
+        Sample each particle's next position from the ghost's transition model.
+        """
+        support = np.unique(self.particles).tolist()
+        matrix = self.getTransitionRows(gameState, support)
+        uniforms = self.getRandomState().random_sample(len(self.particles))
+        self.particles = matrix.sample(self.particles, uniforms)
+
+    def getBeliefDistribution(self):
+        counts = np.bincount(self.particles, minlength=len(self.positions))
+        beliefs = DiscreteDistribution()
+        for pos, count in zip(self.positions, counts.tolist()):
+            if count > 0:
+                beliefs[pos] = count / float(len(self.particles))
+        return beliefs
+
+
 class JointParticleFilter(ParticleFilter):
     """
     JointParticleFilter tracks a joint distribution over tuples of all ghost
@@ -419,6 +713,8 @@ class JointParticleFilter(ParticleFilter):
         self.numGhosts = gameState.getNumAgents() - 1
         self.ghostAgents = []
         self.legalPositions = legalPositions
+        self.allPositions = legalPositions
+        self.initializeDistances()
         self.initializeUniformly(gameState)
 
     def initializeUniformly(self, gameState):
@@ -464,32 +760,62 @@ class JointParticleFilter(ParticleFilter):
         the DiscreteDistribution may be useful.
         """
         p = gameState.getPacmanPosition()
+        likelihoods = []
+        for i in range(self.numGhosts):
+            weights = self.getObservationVector(observation[i], p, self.getJailPosition(i))
+            likelihoods.append(dict(zip(self.legalPositions, weights)))
         beliefDist = DiscreteDistribution()
-        for particle in self.particles:
-            prob = 1
+        for particle, count in self.getParticleCounts().items():
+            prob = count
             for i in range(self.numGhosts):
-                prob *= self.getObservationProb(observation[i], p, particle[i], self.getJailPosition(i))
-            beliefDist[particle] += prob
+                if particle[i] not in likelihoods[i]:
+                    likelihoods[i][particle[i]] = self.getObservationProb(observation[i], p, particle[i], self.getJailPosition(i))
+                prob *= likelihoods[i][particle[i]]
+            beliefDist[particle] = prob
 
         if beliefDist.total() == 0:
             self.initializeUniformly(gameState)
         else:
-            self.particles = [beliefDist.sample() for _ in range(self.numParticles)]
+            self.particles = beliefDist.sample(self.numParticles)
 
     def elapseTime(self, gameState):
         """
         Sample each particle's next state based on its current state and the
         gameState.
+
+        Duplicate particles are propagated together: each distinct particle
+        draws all of its successors for a ghost in one batch.  Within a turn
+        Pacman does not move, so a ghost's transition distribution is
+        memoized by (ghost index, ghost position, Pacman position), or by the
+        whole particle for ghosts that react to the other ghosts.
         """
+        pacmanPosition = gameState.getPacmanPosition()
+        transitions = {}
         newParticles = []
-        for oldParticle in self.particles:
-            newParticle = list(oldParticle)  # A list of ghost positions
-            # now loop through and update each entry in newParticle...
+        for oldParticle, count in self.getParticleCounts().items():
+            successors = []
             for i in range(self.numGhosts):
-                newParticle[i] = self.getPositionDistribution(gameState, oldParticle, i, self.ghostAgents[i]).sample()
-            newParticles.append(tuple(newParticle))
+                agent = self.ghostAgents[i]
+                if getattr(agent, 'usesOtherGhosts', True):
+                    key = (i, oldParticle, pacmanPosition)
+                else:
+                    key = (i, oldParticle[i], pacmanPosition)
+                if key not in transitions:
+                    transitions[key] = self.getPositionDistribution(gameState, oldParticle, i, agent)
+                successors.append(transitions[key].sample(count))
+            newParticles.extend(zip(*successors))
         self.particles = newParticles
 
+    def getParticleCounts(self):
+        """
+        Collapse the particles into a distribution of distinct particles
+        weighted by how many times each occurs.
+        """
+        counts = DiscreteDistribution()
+        for particle in self.particles:
+            counts[particle] += 1
+        return counts
+
 
 # One JointInference module is shared globally across instances of MarginalInference
 jointInference = JointParticleFilter()
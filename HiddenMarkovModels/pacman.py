@@ -71,8 +71,16 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
+    # static variable keeps track of which states have had successors generated.
+    # Tracking is off unless enabled with setExploredTracking, since the set
+    # would otherwise hold on to every state ever generated.
     explored = set()
+    trackExplored = False
+    def setExploredTracking(enabled=True):
+        GameState.trackExplored = enabled
+        if not enabled:
+            GameState.explored = set()
+    setExploredTracking = staticmethod(setExploredTracking)
     def getAndResetExplored():
         tmp = GameState.explored.copy()
         GameState.explored = set()
@@ -120,8 +128,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.trackExplored:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions( self ):
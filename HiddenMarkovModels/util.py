@@ -28,7 +28,7 @@
 
 import sys
 import inspect
-import heapq, random
+import heapq, random, bisect
 import io
 
 
@@ -174,38 +174,116 @@ class PriorityQueue:
       has a priority associated with it and the client is usually interested
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
+
+      push and pop are plain heap operations.  The first call to update or
+      a membership test builds an entry finder mapping each queued item to
+      its heap entry; from then on update marks the old entry as removed
+      instead of scanning and re-heapifying, and pop skips removed entries.
+      A queue holding items that are not hashable falls back to scanning
+      the heap in update and membership tests.
     """
     def  __init__(self):
         self.heap = []
         self.count = 0
+        self.size = 0
+        # Built when update or a membership test first needs it, and dropped
+        # for good once an unhashable item is queued
+        self.entryFinder = None
+        self.hashable = True
 
     def push(self, item, priority):
-        entry = (priority, self.count, item)
+        entry = [priority, self.count, item, True]
         heapq.heappush(self.heap, entry)
         self.count += 1
+        self.size += 1
+        if self.entryFinder is not None:
+            try:
+                self.entryFinder[item] = entry
+            except TypeError:
+                self.dropEntryFinder()
 
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
+        entry = heapq.heappop(self.heap)
+        while not entry[3]:
+            entry = heapq.heappop(self.heap)
+        self.size -= 1
+        item = entry[2]
+        if self.entryFinder is not None and self.entryFinder.get(item) is entry:
+            del self.entryFinder[item]
         return item
 
     def isEmpty(self):
-        return len(self.heap) == 0
+        return self.size == 0
+
+    def buildEntryFinder(self):
+        "Indexes the live heap entries, keeping the most recent entry of each item."
+        self.entryFinder = {}
+        try:
+            for entry in self.heap:
+                if entry[3]:
+                    current = self.entryFinder.get(entry[2])
+                    if current is None or current[1] < entry[1]:
+                        self.entryFinder[entry[2]] = entry
+        except TypeError:
+            self.dropEntryFinder()
+
+    def dropEntryFinder(self):
+        self.entryFinder = None
+        self.hashable = False
+
+    def indexable(self, item):
+        "Returns whether update and membership tests can use the entry finder for item."
+        if self.entryFinder is None and self.hashable:
+            self.buildEntryFinder()
+        if self.hashable:
+            try:
+                hash(item)
+                return True
+            except TypeError:
+                self.dropEntryFinder()
+        return False
 
     def update(self, item, priority):
-        # If item already in priority queue with higher priority, update its priority and rebuild the heap.
+        # If item already in priority queue with higher priority, update its priority.
         # If item already in priority queue with equal or lower priority, do nothing.
         # If item not in priority queue, do the same thing as self.push.
-        for index, (p, c, i) in enumerate(self.heap):
-            if i == item:
-                if p <= priority:
+        # (If item was pushed more than once, its most recent entry is the one considered.)
+        if not self.indexable(item):
+            self.updateByScan(item, priority)
+            return
+        entry = self.entryFinder.get(item)
+        if entry is None:
+            self.push(item, priority)
+            return
+        if entry[0] <= priority:
+            return
+        # Keep the original insertion count so ties still break by age.
+        entry[3] = False
+        newEntry = [priority, entry[1], item, True]
+        heapq.heappush(self.heap, newEntry)
+        self.entryFinder[item] = newEntry
+
+    def updateByScan(self, item, priority):
+        "Update for queues holding unhashable items, scanning the heap."
+        for index, entry in enumerate(self.heap):
+            if entry[3] and entry[2] == item:
+                if entry[0] <= priority:
                     break
                 del self.heap[index]
-                self.heap.append((priority, c, item))
+                self.heap.append([priority, entry[1], item, True])
                 heapq.heapify(self.heap)
                 break
         else:
             self.push(item, priority)
 
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, item):
+        if self.indexable(item):
+            return item in self.entryFinder
+        return any(entry[3] and entry[2] == item for entry in self.heap)
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -233,7 +311,138 @@ def manhattanDistance( xy1, xy2 ):
   The search project should not need anything below this line.
 """
 
-class Counter(dict):
+class CompiledDistribution:
+    """
+    A frozen discrete distribution over keys, compiled for repeated sampling.
+
+    The cumulative weights give inverse-CDF draws that reproduce the linear
+    scans used elsewhere in this file (same random numbers, same keys), and
+    Vose alias tables, built on first use, give O(1) draws for batches.
+
+    >>> d = CompiledDistribution(['a', 'b', 'c'], [1, 2, 0])
+    >>> d.total
+    3.0
+    >>> d.fromUniform(0.5)
+    'b'
+    >>> samples = d.sample(30000)
+    >>> round(samples.count('b') / 30000.0, 1), samples.count('c')
+    (0.7, 0)
+    """
+    def __init__(self, keys, weights):
+        self.keys = list(keys)
+        self.weights = [float(w) for w in weights]
+        self.cumulative = []
+        total = 0.0
+        for w in self.weights:
+            total += w
+            self.cumulative.append(total)
+        self.total = total
+        self.aliasTable = None
+
+    def fromUniform(self, u):
+        """
+        Return the key whose slice of the cumulative weights contains u * total
+        for u in [0, 1): the first key whose cumulative weight reaches it.
+        """
+        if not self.keys:
+            return None
+        i = bisect.bisect_left(self.cumulative, u * self.total)
+        return self.keys[min(i, len(self.keys) - 1)]
+
+    def sample(self, k=None):
+        """
+        Draw one key, or a list of k keys when k is given.
+        """
+        if k is None:
+            return self.fromUniform(random.random())
+        if not self.keys or self.total <= 0:
+            return [self.fromUniform(0.0)] * k
+        probs, aliases = self.getAliasTable()
+        n = len(self.keys)
+        keys = self.keys
+        samples = []
+        for _ in range(k):
+            u = random.random() * n
+            i = int(u)
+            samples.append(keys[i] if u - i < probs[i] else keys[aliases[i]])
+        return samples
+
+    def getAliasTable(self):
+        """
+        Build (once) Vose's alias tables: column i keeps its own key with
+        probability probs[i] and otherwise yields keys[aliases[i]].
+        """
+        if self.aliasTable is None:
+            n = len(self.keys)
+            scaled = [w * n / self.total for w in self.weights]
+            probs, aliases = [1.0] * n, list(range(n))
+            small = [i for i, p in enumerate(scaled) if p < 1.0]
+            large = [i for i, p in enumerate(scaled) if p >= 1.0]
+            while small and large:
+                s, l = small.pop(), large.pop()
+                probs[s], aliases[s] = scaled[s], l
+                scaled[l] -= 1.0 - scaled[s]
+                if scaled[l] < 1.0:
+                    small.append(l)
+                else:
+                    large.append(l)
+            self.aliasTable = (probs, aliases)
+        return self.aliasTable
+
+class CompilingDict(dict):
+    """
+    A dict of weights that caches a CompiledDistribution of its items and
+    drops it whenever the dict is mutated.  Adding a missing key with value 0
+    (as the defaulting __getitem__ of subclasses does) leaves the cache alone,
+    since zero-weight keys are never drawn.
+    """
+    _compiled = None
+
+    def compile(self):
+        """
+        Return the cached CompiledDistribution of the current items.
+        """
+        if self._compiled is None:
+            self._compiled = CompiledDistribution(self.keys(), self.values())
+        return self._compiled
+
+    def sample(self, k=None):
+        """
+        Draw one key, or a list of k keys, weighted by their values.
+        """
+        return self.compile().sample(k)
+
+    def __setitem__(self, key, value):
+        self._compiled = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._compiled = None
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key, default=None):
+        if key not in self and default:
+            self._compiled = None
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self._compiled = None
+        dict.update(self, *args, **kwargs)
+
+    def pop(self, *args):
+        self._compiled = None
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._compiled = None
+        return dict.popitem(self)
+
+    def clear(self):
+        self._compiled = None
+        dict.clear(self)
+
+
+class Counter(CompilingDict):
     """
     A counter keeps track of counts for a set of keys.
 
@@ -271,10 +480,12 @@ class Counter(dict):
     The counter also includes additional functionality useful in implementing
     the classifiers for this assignment.  Two counters can be added,
     subtracted or multiplied together.  See below for details.  They can
-    also be normalized and their total count and arg max can be extracted.
+    also be normalized and their total count and arg max can be extracted,
+    and sampled from (see CompilingDict) without rescanning the items on
+    every draw.
     """
     def __getitem__(self, idx):
-        self.setdefault(idx, 0)
+        dict.setdefault(self, idx, 0)
         return dict.__getitem__(self, idx)
 
     def incrementAll(self, keys, count):
@@ -474,20 +685,7 @@ def normalize(vectorOrCounter):
         return [el / s for el in vector]
 
 def nSample(distribution, values, n):
-    if sum(distribution) != 1:
-        distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
-    rand.sort()
-    samples = []
-    samplePos, distPos, cdf = 0,0, distribution[0]
-    while samplePos < n:
-        if rand[samplePos] < cdf:
-            samplePos += 1
-            samples.append(values[distPos])
-        else:
-            distPos += 1
-            cdf += distribution[distPos]
-    return samples
+    return CompiledDistribution(values, distribution).sample(n)
 
 def sample(distribution, values = None):
     if type(distribution) == Counter:
@@ -32,7 +32,7 @@ def get_data_path(filename):
         path = os.path.join(
             os.path.dirname(__file__), filename)
     if not os.path.exists(path):
-        raise Exception("Could not find data file: {}".format(filename))
+        raise FileNotFoundError("Could not find data file: {}".format(filename))
     return path
 
 class Dataset(object):
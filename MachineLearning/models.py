@@ -78,8 +78,8 @@ class RegressionModel(object):
         Returns:
             A node with shape (batch_size x 1) containing predicted y-values
         """
-        res = nn.ReLU(nn.AddBias(nn.Linear(x, self.layers[0]), self.layers[1]))
-        return nn.AddBias(nn.Linear(res, self.layers[-2]), self.layers[-1])
+        res = nn.Dense(x, self.layers[0], self.layers[1], relu=True)
+        return nn.Dense(res, self.layers[-2], self.layers[-1])
 
     def get_loss(self, x, y):
         """
@@ -97,8 +97,9 @@ class RegressionModel(object):
         """
         Trains the model.
         """
+        get_loss = nn.Trace(self.get_loss)
         for x, y in dataset.iterate_forever(self.batch_size):
-            loss = self.get_loss(x, y)
+            loss = get_loss(x, y)
             if nn.as_scalar(loss) < .02:    return
             gradients = nn.gradients(loss, self.layers)
             for i in range(self.numLayers):
@@ -155,10 +156,10 @@ class DigitClassificationModel(object):
             A node with shape (batch_size x 10) containing predicted scores
                 (also called logits)
         """
-        res = nn.ReLU(nn.AddBias(nn.Linear(x, self.layers[0]), self.layers[1]))
-        res = nn.ReLU(nn.AddBias(nn.Linear(res, self.layers[2]), self.layers[3]))
-        res = nn.ReLU(nn.AddBias(nn.Linear(res, self.layers[4]), self.layers[5]))
-        return nn.AddBias(nn.Linear(res, self.layers[-2]), self.layers[-1])
+        res = nn.Dense(x, self.layers[0], self.layers[1], relu=True)
+        res = nn.Dense(res, self.layers[2], self.layers[3], relu=True)
+        res = nn.Dense(res, self.layers[4], self.layers[5], relu=True)
+        return nn.Dense(res, self.layers[-2], self.layers[-1])
 
     def get_loss(self, x, y):
         """
@@ -179,8 +180,9 @@ class DigitClassificationModel(object):
         """
         Trains the model.
         """
+        get_loss = nn.Trace(self.get_loss)
         for x, y in dataset.iterate_forever(self.batch_size):
-            loss = self.get_loss(x, y)
+            loss = get_loss(x, y)
             gradients = nn.gradients(loss, self.layers)
             for i in range(self.numLayers):
                 self.layers[i].update(gradients[i], self.learning_rate)
@@ -273,8 +275,9 @@ class LanguageIDModel(object):
         """
         Trains the model.
         """
+        get_loss = nn.Trace(self.get_loss)
         for x, y in dataset.iterate_forever(self.batch_size):
-            loss = self.get_loss(x, y)
+            loss = get_loss(x, y)
             gradients = nn.gradients(loss, [self.W, self.W_hidden, self.W_last])
             self.W.update(gradients[0], self.learning_rate)
             self.W_hidden.update(gradients[1], self.learning_rate)
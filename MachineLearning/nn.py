@@ -1,8 +1,45 @@
+import os
+
 import numpy as np
 
 def format_shape(shape):
     return "x".join(map(str, shape)) if shape else "()"
 
+# In fast mode, the shape and value checks of each node type run only the
+# first time it sees a given signature (its type and input shapes), instead
+# of on every forward pass, backward pass and parameter update.
+_fast_mode = os.environ.get("NN_FAST_MODE", "").lower() in ("1", "true", "yes")
+_checked = set()
+
+def set_fast_mode(enabled=True):
+    """
+    Turns fast mode on or off, and returns whether it was on before. Fast
+    mode can also be turned on by setting the NN_FAST_MODE environment
+    variable to 1.
+
+    In fast mode, each check runs once per distinct signature and is then
+    skipped, so a training loop with fixed shapes is validated on its first
+    batch only. Value checks (such as labels summing to 1, or parameters
+    staying finite) are therefore only applied to that first batch.
+    """
+    global _fast_mode
+    previous = _fast_mode
+    _fast_mode = bool(enabled)
+    _checked.clear()
+    return previous
+
+def _needs_check(signature):
+    """
+    Returns whether checks should run for signature, recording it as checked
+    when in fast mode.
+    """
+    if not _fast_mode:
+        return True
+    if signature in _checked:
+        return False
+    _checked.add(signature)
+    return True
+
 class Node(object):
     def __repr__(self):
         return "<{} shape={} at {}>".format(
@@ -40,8 +77,26 @@ class Parameter(DataNode):
         limit = np.sqrt(3.0 / np.mean(shape))
         data = np.random.uniform(low=-limit, high=limit, size=shape)
         super().__init__(data)
+        # Buffers reused across training steps: the gradient returned by
+        # `nn.gradients` and the scaled direction applied by `update`
+        self.gradient = None
+        self.step = None
 
     def update(self, direction, multiplier):
+        check = _needs_check((Parameter, self.data.shape, type(direction),
+                              np.shape(getattr(direction, "data", None)),
+                              type(multiplier)))
+        if check:
+            self._check_update(direction, multiplier)
+        if self.step is None:
+            self.step = np.empty_like(self.data)
+        np.multiply(direction.data, multiplier, out=self.step)
+        self.data += self.step
+        if check:
+            assert np.all(np.isfinite(self.data)), (
+                "Parameter contains NaN or infinity after update, cannot continue")
+
+    def _check_update(self, direction, multiplier):
         assert isinstance(direction, Constant), (
             "Update direction must be a {} node, instead has type {!r}".format(
                 Constant.__name__, type(direction).__name__))
@@ -53,9 +108,6 @@ class Parameter(DataNode):
         assert isinstance(multiplier, (int, float)), (
             "Multiplier must be a Python scalar, instead has type {!r}".format(
                 type(multiplier).__name__))
-        self.data += multiplier * direction.data
-        assert np.all(np.isfinite(self.data)), (
-            "Parameter contains NaN or infinity after update, cannot continue")
 
 class Constant(DataNode):
     """
@@ -82,11 +134,22 @@ class FunctionNode(Node):
     The FunctionNode class performs necessary book-keeping to compute gradients.
     """
     def __init__(self, *parents):
-        assert all(isinstance(parent, Node) for parent in parents), (
-            "Inputs must be node objects, instead got types {!r}".format(
-                tuple(type(parent).__name__ for parent in parents)))
+        # The parent types are part of the signature, so fast mode checks
+        # each combination of parent types once per node type
+        parent_types = tuple(map(type, parents))
+        if _needs_check((FunctionNode, type(self)) + parent_types):
+            assert all(isinstance(parent, Node) for parent in parents), (
+                "Inputs must be node objects, instead got types {!r}".format(
+                    tuple(type(parent).__name__ for parent in parents)))
         self.parents = parents
-        self.data = self._forward(*(parent.data for parent in parents))
+        inputs = tuple(parent.data for parent in parents)
+        if _needs_check((type(self),) + tuple(np.shape(x) for x in inputs)):
+            self._check(*inputs)
+        self.data = self._forward(*inputs)
+
+    @staticmethod
+    def _check(*inputs):
+        pass
 
 class Add(FunctionNode):
     """
@@ -100,7 +163,7 @@ class Add(FunctionNode):
         a Node with shape (batch_size x num_features)
     """
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 2, "Expected 2 inputs, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "First input should have 2 dimensions, instead has {}".format(
@@ -111,11 +174,13 @@ class Add(FunctionNode):
         assert inputs[0].shape == inputs[1].shape, (
             "Input shapes should match, instead got {} and {}".format(
                 format_shape(inputs[0].shape), format_shape(inputs[1].shape)))
+
+    @staticmethod
+    def _forward(*inputs):
         return inputs[0] + inputs[1]
 
     @staticmethod
     def _backward(gradient, *inputs):
-        assert gradient.shape == inputs[0].shape
         return [gradient, gradient]
 
 class AddBias(FunctionNode):
@@ -130,7 +195,7 @@ class AddBias(FunctionNode):
         a Node with shape (batch_size x num_features)
     """
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 2, "Expected 2 inputs, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "First input should have 2 dimensions, instead has {}".format(
@@ -145,11 +210,13 @@ class AddBias(FunctionNode):
             "Second dimension of inputs should match, instead got shapes {} "
             "and {}".format(
                 format_shape(inputs[0].shape), format_shape(inputs[1].shape)))
+
+    @staticmethod
+    def _forward(*inputs):
         return inputs[0] + inputs[1]
 
     @staticmethod
     def _backward(gradient, *inputs):
-        assert gradient.shape == inputs[0].shape
         return [gradient, np.sum(gradient, axis=0, keepdims=True)]
 
 class DotProduct(FunctionNode):
@@ -163,7 +230,7 @@ class DotProduct(FunctionNode):
     Output: a Node with shape (batch_size x 1)
     """
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 2, "Expected 2 inputs, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "First input should have 2 dimensions, instead has {}".format(
@@ -178,6 +245,9 @@ class DotProduct(FunctionNode):
             "Second dimension of inputs should match, instead got shapes {} "
             "and {}".format(
                 format_shape(inputs[0].shape), format_shape(inputs[1].shape)))
+
+    @staticmethod
+    def _forward(*inputs):
         return np.dot(inputs[0], inputs[1].T)
 
     @staticmethod
@@ -200,7 +270,7 @@ class Linear(FunctionNode):
     Output: a node with shape (batch_size x input_features)
     """
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 2, "Expected 2 inputs, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "First input should have 2 dimensions, instead has {}".format(
@@ -212,14 +282,63 @@ class Linear(FunctionNode):
             "Second dimension of first input should match first dimension of "
             "second input, instead got shapes {} and {}".format(
                 format_shape(inputs[0].shape), format_shape(inputs[1].shape)))
+
+    @staticmethod
+    def _forward(*inputs):
         return np.dot(inputs[0], inputs[1])
 
     @staticmethod
     def _backward(gradient, *inputs):
-        assert gradient.shape[0] == inputs[0].shape[0]
-        assert gradient.shape[1] == inputs[1].shape[1]
         return [np.dot(gradient, inputs[1].T), np.dot(inputs[0].T, gradient)]
 
+class Dense(FunctionNode):
+    """
+    A fully connected layer: applies a linear transformation to the input,
+    adds a bias vector and optionally applies ReLU, as a single node.
+
+    This computes the same values as nn.ReLU(nn.AddBias(nn.Linear(features,
+    weights), bias)) (or the same without nn.ReLU), but with one output
+    array and one combined backward step instead of three.
+
+    Usage: nn.Dense(features, weights, bias, relu=True)
+    Inputs:
+        features: a Node with shape (batch_size x input_features)
+        weights: a Node with shape (input_features x output_features)
+        bias: a Node with shape (1 x output_features)
+        relu: whether to apply ReLU to the result
+    Output: a node with shape (batch_size x output_features)
+    """
+    def __init__(self, features, weights, bias, relu=False):
+        self.relu = relu
+        super().__init__(features, weights, bias)
+
+    @staticmethod
+    def _check(*inputs):
+        assert len(inputs) == 3, "Expected 3 inputs, got {}".format(len(inputs))
+        assert all(input.ndim == 2 for input in inputs), (
+            "Inputs should have 2 dimensions, instead have {}".format(
+                tuple(input.ndim for input in inputs)))
+        assert inputs[0].shape[1] == inputs[1].shape[0], (
+            "Second dimension of features should match first dimension of "
+            "weights, instead got shapes {} and {}".format(
+                format_shape(inputs[0].shape), format_shape(inputs[1].shape)))
+        assert inputs[2].shape == (1, inputs[1].shape[1]), (
+            "Bias should have shape 1x{}, instead got shape {}".format(
+                inputs[1].shape[1], format_shape(inputs[2].shape)))
+
+    def _forward(self, *inputs):
+        output = np.dot(inputs[0], inputs[1])
+        output += inputs[2]
+        if self.relu:
+            np.maximum(output, 0, out=output)
+        return output
+
+    def _backward(self, gradient, *inputs):
+        if self.relu:
+            gradient = gradient * (self.data > 0)
+        return [np.dot(gradient, inputs[1].T), np.dot(inputs[0].T, gradient),
+                np.sum(gradient, axis=0, keepdims=True)]
+
 class ReLU(FunctionNode):
     """
     An element-wise Rectified Linear Unit nonlinearity: max(x, 0).
@@ -231,17 +350,19 @@ class ReLU(FunctionNode):
     Output: a Node with the same shape as x, but no negative entries
     """
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 1, "Expected 1 input, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "Input should have 2 dimensions, instead has {}".format(
                 inputs[0].ndim))
+
+    @staticmethod
+    def _forward(*inputs):
         return np.maximum(inputs[0], 0)
 
     @staticmethod
     def _backward(gradient, *inputs):
-        assert gradient.shape == inputs[0].shape
-        return [gradient * np.where(inputs[0] > 0, 1.0, 0.0)]
+        return [gradient * (inputs[0] > 0)]
 
 class SquareLoss(FunctionNode):
     """
@@ -256,7 +377,7 @@ class SquareLoss(FunctionNode):
     Output: a scalar Node (containing a single floating-point number)
     """
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 2, "Expected 2 inputs, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "First input should have 2 dimensions, instead has {}".format(
@@ -267,11 +388,13 @@ class SquareLoss(FunctionNode):
         assert inputs[0].shape == inputs[1].shape, (
             "Input shapes should match, instead got {} and {}".format(
                 format_shape(inputs[0].shape), format_shape(inputs[1].shape)))
+
+    @staticmethod
+    def _forward(*inputs):
         return np.mean(np.square(inputs[0] - inputs[1]) / 2)
 
     @staticmethod
     def _backward(gradient, *inputs):
-        assert np.asarray(gradient).ndim == 0
         return [
             gradient * (inputs[0] - inputs[1]) / inputs[0].size,
             gradient * (inputs[1] - inputs[0]) / inputs[0].size
@@ -300,7 +423,7 @@ class SoftmaxLoss(FunctionNode):
         return log_probs
 
     @staticmethod
-    def _forward(*inputs):
+    def _check(*inputs):
         assert len(inputs) == 2, "Expected 2 inputs, got {}".format(len(inputs))
         assert inputs[0].ndim == 2, (
             "First input should have 2 dimensions, instead has {}".format(
@@ -315,18 +438,37 @@ class SoftmaxLoss(FunctionNode):
             "All entries in the labels input must be non-negative")
         assert np.allclose(np.sum(inputs[1], axis=1), 1), (
             "Labels input must sum to 1 along each row")
+
+    @staticmethod
+    def _forward(*inputs):
         log_probs = SoftmaxLoss.log_softmax(inputs[0])
         return np.mean(-np.sum(inputs[1] * log_probs, axis=1))
 
     @staticmethod
     def _backward(gradient, *inputs):
-        assert np.asarray(gradient).ndim == 0
         log_probs = SoftmaxLoss.log_softmax(inputs[0])
         return [
             gradient * (np.exp(log_probs) - inputs[1]) / inputs[0].shape[0],
             gradient * -log_probs / inputs[0].shape[0]
         ]
 
+def _topological_order(loss):
+    """
+    Returns the nodes that loss depends on, each after all of its parents.
+    """
+    nodes = set()
+    tape = []
+
+    def visit(node):
+        if node not in nodes:
+            for parent in node.parents:
+                visit(parent)
+            nodes.add(node)
+            tape.append(node)
+
+    visit(loss)
+    return tape
+
 def gradients(loss, parameters):
     """
     Computes and returns the gradient of the loss with respect to the provided
@@ -338,6 +480,10 @@ def gradients(loss, parameters):
         parameters: a list (or iterable) containing Parameter nodes
     Output: a list of Constant objects, representing the gradient of the loss
         with respect to each provided parameter.
+
+    The gradient of each parameter is accumulated into a buffer owned by the
+    parameter, which is reused (and overwritten) by the next call, so use or
+    copy the returned gradients before computing new ones.
     """
 
     assert isinstance(loss, (SquareLoss, SoftmaxLoss)), (
@@ -347,34 +493,122 @@ def gradients(loss, parameters):
         "Parameters must all have type {}, instead got types {!r}".format(
             Parameter.__name__,
             tuple(type(parameter).__name__ for parameter in parameters)))
-    assert not hasattr(loss, "used"), (
+    assert not getattr(loss, "used", False), (
         "Loss node has already been used for backpropagation, cannot reuse")
 
     loss.used = True
 
-    nodes = set()
-    tape = []
-
-    def visit(node):
-        if node not in nodes:
-            for parent in node.parents:
-                visit(parent)
-            nodes.add(node)
-            tape.append(node)
-
-    visit(loss)
-    nodes |= set(parameters)
-
-    grads = {node: np.zeros_like(node.data) for node in nodes}
-    grads[loss] = 1.0
-
+    # A loss produced by a Trace carries its recorded schedule; any other
+    # loss is sorted topologically here
+    tape = getattr(loss, "tape", None)
+    if tape is None:
+        tape = _topological_order(loss)
+
+    # Parameters accumulate into their own reused buffers; every other node
+    # keeps the first gradient it receives as is, and only gets an array of
+    # its own if a second contribution has to be added to it
+    buffers = {}
+    for parameter in parameters:
+        if parameter.gradient is None or parameter.gradient.shape != parameter.data.shape:
+            parameter.gradient = np.empty_like(parameter.data)
+        buffers[parameter] = parameter.gradient
+
+    grads = {loss: 1.0}
+    owned = set()
     for node in reversed(tape):
-        parent_grads = node._backward(
-            grads[node], *(parent.data for parent in node.parents))
+        if node not in grads or isinstance(node, DataNode):
+            continue
+        inputs = tuple(parent.data for parent in node.parents)
+        parent_grads = node._backward(grads[node], *inputs)
+        if _needs_check((gradients, type(node), np.shape(grads[node])) +
+                        tuple(x.shape for x in inputs)):
+            for parent_grad, x in zip(parent_grads, inputs):
+                assert np.shape(parent_grad) == x.shape, (
+                    "{} gradient has shape {}, expected {}".format(
+                        type(node).__name__,
+                        format_shape(np.shape(parent_grad)),
+                        format_shape(x.shape)))
         for parent, parent_grad in zip(node.parents, parent_grads):
-            grads[parent] += parent_grad
-
-    return [Constant(grads[parameter]) for parameter in parameters]
+            if parent in owned:
+                grads[parent] += parent_grad
+            elif parent in buffers:
+                np.copyto(buffers[parent], parent_grad)
+                grads[parent] = buffers[parent]
+                owned.add(parent)
+            elif parent in grads:
+                grads[parent] = grads[parent] + parent_grad
+                owned.add(parent)
+            else:
+                grads[parent] = parent_grad
+
+    for parameter in parameters:
+        if parameter not in grads:
+            buffers[parameter].fill(0.0)
+    return [Constant(buffers[parameter]) for parameter in parameters]
+
+class Trace(object):
+    """
+    Wraps a function that builds a loss node (such as a model's `get_loss`),
+    and records the graph it builds once per input shape signature. Later
+    calls with inputs of the same shapes replay the recorded graph on the new
+    data instead of building a new one, and `nn.gradients` reuses its
+    recorded order instead of sorting the graph again.
+
+    Usage:
+        get_loss = nn.Trace(model.get_loss)
+        loss = get_loss(x, y)
+        grads = nn.gradients(loss, parameters)
+
+    The arguments may be Constant nodes or lists of Constant nodes. The graph
+    built by the function must depend only on the shapes of its inputs, so a
+    recurrent model gets one recording per sequence length. The function is
+    called with Constant nodes owned by the Trace, so the caller's inputs are
+    never modified, but the returned loss node (and every node in its graph)
+    is overwritten by the next call with the same signature.
+    """
+    def __init__(self, function):
+        self.function = function
+        self.recordings = {}
+
+    def __call__(self, *args):
+        inputs = []
+        signature = []
+        for arg in args:
+            if isinstance(arg, (list, tuple)):
+                inputs.extend(arg)
+                signature.append(tuple(node.data.shape for node in arg))
+            else:
+                inputs.append(arg)
+                signature.append(arg.data.shape)
+        signature = tuple(signature)
+
+        recording = self.recordings.get(signature)
+        if recording is None:
+            placeholders = [Constant(node.data) for node in inputs]
+            remaining = iter(placeholders)
+            loss = self.function(*(
+                [next(remaining) for _ in arg]
+                if isinstance(arg, (list, tuple)) else next(remaining)
+                for arg in args))
+            loss.tape = _topological_order(loss)
+            steps = [node for node in loss.tape
+                     if isinstance(node, FunctionNode)]
+            self.recordings[signature] = (placeholders, steps, loss)
+            return loss
+
+        placeholders, steps, loss = recording
+        for placeholder, node in zip(placeholders, inputs):
+            placeholder.data = node.data
+        check = not _fast_mode
+        for node in steps:
+            values = tuple(parent.data for parent in node.parents)
+            if check:
+                node._check(*values)
+            node.data = node._forward(*values)
+        # The recorded loss now holds a new value, which has not been used
+        # for backpropagation yet
+        loss.used = False
+        return loss
 
 def as_scalar(node):
     """
@@ -0,0 +1,68 @@
+"""
+Times training steps of the digit classification and language identification
+models with nn fast mode off and on, and with get_loss replayed by nn.Trace.
+
+Usage: python nn_benchmark.py [steps]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import backend
+import models
+import nn
+
+def time_steps(make_model, make_dataset, parameters, steps, fast, trace=False):
+    """
+    Runs `steps` training steps on a fresh model (from the same random seed)
+    and returns the mean time per step in milliseconds.
+    """
+    np.random.seed(0)
+    model = make_model()
+    dataset = make_dataset(model)
+    previous = nn.set_fast_mode(fast)
+    try:
+        get_loss = nn.Trace(model.get_loss) if trace else model.get_loss
+        batches = dataset.iterate_forever(model.batch_size)
+        start = time.time()
+        for _ in range(steps):
+            x, y = next(batches)
+            loss = get_loss(x, y)
+            params = parameters(model)
+            grads = nn.gradients(loss, params)
+            for param, grad in zip(params, grads):
+                param.update(grad, model.learning_rate)
+        elapsed = time.time() - start
+    finally:
+        nn.set_fast_mode(previous)
+    return 1000.0 * elapsed / steps
+
+def benchmark(name, make_model, make_dataset, parameters, steps):
+    # Only a missing data file, found when the first run loads the dataset,
+    # skips a benchmark; any other error is raised
+    try:
+        checked = time_steps(make_model, make_dataset, parameters, steps, False)
+    except FileNotFoundError as e:
+        print("{:<8} skipped: {}".format(name, e))
+        return
+    fast = time_steps(make_model, make_dataset, parameters, steps, True)
+    traced = time_steps(
+        make_model, make_dataset, parameters, steps, True, trace=True)
+    print("{:<8} checked {:.3f} ms/step, fast {:.3f} ms/step ({:.1%} faster), "
+          "fast+trace {:.3f} ms/step ({:.1%} faster)".format(
+              name, checked, fast, 1 - fast / checked,
+              traced, 1 - traced / checked))
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    backend.use_graphics = False
+    benchmark("mnist", models.DigitClassificationModel,
+              backend.DigitClassificationDataset,
+              lambda model: model.layers, steps)
+    benchmark("lang_id", models.LanguageIDModel, backend.LanguageIDDataset,
+              lambda model: [model.W, model.W_hidden, model.W_last], steps)
+
+if __name__ == "__main__":
+    main()
@@ -380,5 +380,17 @@ class CrawlingRobot:
 
 
 if __name__ == '__main__':
+    from optparse import OptionParser
+    optParser = OptionParser()
+    optParser.add_option('-a', '--agent', action='store', metavar="A",
+                         type='string', dest='agent', default='q',
+                         help='Learner type (options are \'q\', \'qlambda\' and \'sarsalambda\', default %default)')
+    optParser.add_option('--lambda', action='store', metavar="L",
+                         type='float', dest='lam', default=0.9,
+                         help='Eligibility trace decay of the qlambda and sarsalambda learners (default %default)')
+    opts, args = optParser.parse_args()
+
     from graphicsCrawlerDisplay import *
-    run()
+    if opts.agent not in learners:
+        raise Exception('Unknown agent type: ' + opts.agent)
+    run(opts.agent, opts.lam)
@@ -15,8 +15,50 @@
 "Feature extractors for Pacman game states"
 
 from game import Directions, Actions
+from collections import deque
 import util
 
+class SparseFeatures:
+    """
+    A feature vector in sparse form: parallel tuples of interned feature
+    ids and their values, in the order the extractor produced them.
+    """
+    __slots__ = ('ids', 'values')
+
+    def __init__(self, ids, values):
+        self.ids = ids
+        self.values = values
+
+    def __len__(self):
+        return len(self.ids)
+
+class FeatureIndex:
+    """
+    Interns feature keys to consecutive integer ids, so that weights can be
+    stored densely and feature vectors sparsely.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def getId(self, key):
+        featureId = self.ids.get(key)
+        if featureId is None:
+            featureId = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+        return featureId
+
+    def encode(self, features):
+        """
+        Converts a dict from features to values into SparseFeatures.
+        """
+        getId = self.getId
+        return SparseFeatures(tuple([getId(key) for key in features]),
+                              tuple(features.values()))
+
 class FeatureExtractor:
     def getFeatures(self, state, action):
         """
@@ -46,10 +88,10 @@ def closestFood(pos, food, walls):
     closestFood -- this is similar to the function that we have
     worked on in the search project; here its all in one place
     """
-    fringe = [(pos[0], pos[1], 0)]
+    fringe = deque([(pos[0], pos[1], 0)])
     expanded = set()
     while fringe:
-        pos_x, pos_y, dist = fringe.pop(0)
+        pos_x, pos_y, dist = fringe.popleft()
         if (pos_x, pos_y) in expanded:
             continue
         expanded.add((pos_x, pos_y))
@@ -63,6 +105,27 @@ def closestFood(pos, food, walls):
     # no food found
     return None
 
+def foodDistances(food, walls):
+    """
+    Returns a dict from each open position that can reach food to its
+    maze distance to the closest food, found by one breadth-first search
+    started from every food at once.  Looking a position up gives the same
+    answer as closestFood, for all positions on the board in one pass.
+    """
+    distances = {}
+    fringe = deque()
+    for pos in food.asList():
+        distances[pos] = 0
+        fringe.append(pos)
+    while fringe:
+        pos = fringe.popleft()
+        dist = distances[pos] + 1
+        for nbr in Actions.getLegalNeighbors(pos, walls):
+            if nbr not in distances:
+                distances[nbr] = dist
+                fringe.append(nbr)
+    return distances
+
 class SimpleExtractor(FeatureExtractor):
     """
     Returns simple features for a basic reflex Pacman:
@@ -70,7 +133,21 @@ class SimpleExtractor(FeatureExtractor):
     - how far away the next food is
     - whether a ghost collision is imminent
     - whether a ghost is one step away
+
+    Food distances come from a foodDistances map that is rebuilt only when
+    the food or walls change, rather than a search per call.
     """
+    def __init__(self):
+        self.food = None
+        self.walls = None
+        self.distances = None
+
+    def getFoodDistances(self, food, walls):
+        if not (food is self.food or food == self.food) or \
+           not (walls is self.walls or walls == self.walls):
+            self.food, self.walls = food, walls
+            self.distances = foodDistances(food, walls)
+        return self.distances
 
     def getFeatures(self, state, action):
         # extract the grid of food and wall locations and get the ghost locations
@@ -94,7 +171,10 @@ class SimpleExtractor(FeatureExtractor):
         if not features["#-of-ghosts-1-step-away"] and food[next_x][next_y]:
             features["eats-food"] = 1.0
 
-        dist = closestFood((next_x, next_y), food, walls)
+        if walls[next_x][next_y]:
+            dist = closestFood((next_x, next_y), food, walls)
+        else:
+            dist = self.getFoodDistances(food, walls).get((next_x, next_y))
         if dist is not None:
             # make the distance a number less than one otherwise the update
             # will diverge wildly
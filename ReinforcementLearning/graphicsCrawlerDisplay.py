@@ -34,6 +34,10 @@ from math import pi as PI
 
 robotType = 'crawler'
 
+learners = {'q': qlearningAgents.QLearningAgent,
+            'qlambda': qlearningAgents.QLambdaAgent,
+            'sarsalambda': qlearningAgents.SarsaLambdaAgent}
+
 class Application:
 
     def sigmoid(self, x):
@@ -156,7 +160,7 @@ class Application:
     def skip5kSteps(self):
         self.stepsToSkip = 5000
 
-    def __init__(self, win):
+    def __init__(self, win, agent='q', lam=0.9):
 
         self.ep = 0
         self.ga = 2
@@ -182,7 +186,10 @@ class Application:
           simulation.SimulationEnvironment(self.robotEnvironment,agent)
         actionFn = lambda state: \
           self.robotEnvironment.getPossibleActions(state)
-        self.learner = qlearningAgents.QLearningAgent(actionFn=actionFn)
+        if agent == 'q':
+            self.learner = qlearningAgents.QLearningAgent(actionFn=actionFn)
+        else:
+            self.learner = learners[agent](actionFn=actionFn, lam=lam)
 
         self.learner.setEpsilon(self.epsilon)
         self.learner.setLearningRate(self.alpha)
@@ -311,7 +318,7 @@ class Application:
 
 
 
-def run():
+def run(agent='q', lam=0.9):
     global root
     root = tkinter.Tk()
     root.title( 'Crawler GUI' )
@@ -320,7 +327,7 @@ def run():
 #  root.mainloop()
 
 
-    app = Application(root)
+    app = Application(root, agent, lam)
     def update_gui():
         app.robot.draw(app.stepCount, app.tickTime)
         root.after(10, update_gui)
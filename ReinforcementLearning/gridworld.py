@@ -303,6 +303,24 @@ def getBookGrid():
             ['S',' ',' ',' ']]
     return Gridworld(grid)
 
+def getLargeGrid(width=100, height=100, seed=0):
+    """
+    A generated width x height gridworld, for benchmarking solvers: about
+    a fifth of the cells are walls and a few are pits, with the start in
+    the bottom left corner and the +10 exit in the top right.
+    """
+    rand = random.Random(seed)
+    grid = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            r = rand.random()
+            row.append('#' if r < 0.2 else (-10 if r < 0.21 else ' '))
+        grid.append(row)
+    grid[-1][0] = 'S'
+    grid[0][-1] = 10
+    return Gridworld(grid)
+
 def getMazeGrid():
     grid = [[' ',' ',' ',+1],
             ['#','#',' ','#'],
@@ -337,6 +355,27 @@ def getUserAction(state, actionFunction):
 
 def printString(x): print(x)
 
+def writeSweepLog(agent, fileName):
+    """
+    Write a value iteration agent's sweepLog as tab-separated columns, to
+    the console if fileName is '-'.
+    """
+    lines = ['sweep\tresidual\tseconds\tbackups\tsolves']
+    for record in agent.sweepLog:
+        lines.append('%d\t%g\t%.6f\t%d\t%d' % record)
+    if fileName == '-':
+        print('\n'.join(lines))
+    else:
+        with open(fileName, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    bound = agent.getPolicyLossBound()
+    last = agent.sweepLog[-1] if agent.sweepLog else None
+    summary = '%s: %d sweeps, %d backups, %d solves, %s' % (agent.__class__.__name__, len(agent.sweepLog),
+        last.backups if last else 0, last.solves if last else 0, agent.converged and 'converged' or 'not converged')
+    if bound is not None:
+        summary += ', greedy policy loss <= %g' % bound
+    print(summary)
+
 def runEpisode(agent, environment, discount, decision, display, message, pause, episode):
     returns = 0
     totalDiscount = 1.0
@@ -395,6 +434,9 @@ def parseOptions():
     optParser.add_option('-l', '--learningRate',action='store',
                          type='float',dest='learningRate',default=0.5,
                          metavar="P", help='TD learning rate (default %default)' )
+    optParser.add_option('--lambda',action='store',
+                         type='float',dest='lam',default=0.9,
+                         metavar="L", help='Eligibility trace decay of the qlambda and sarsalambda agents (default %default)')
     optParser.add_option('-i', '--iterations',action='store',
                          type='int',dest='iters',default=10,
                          metavar="K", help='Number of rounds of value iteration (default %default)')
@@ -408,7 +450,7 @@ def parseOptions():
                          help='Request a window width of X pixels *per grid cell* (default %default)')
     optParser.add_option('-a', '--agent',action='store', metavar="A",
                          type='string',dest='agent',default="random",
-                         help='Agent type (options are \'random\', \'value\' and \'q\', default %default)')
+                         help='Agent type (options are \'random\', \'value\', \'matrixvalue\', \'policy\', \'modpolicy\', \'q\', \'qlambda\' and \'sarsalambda\', default %default)')
     optParser.add_option('-t', '--text',action='store_true',
                          dest='textDisplay',default=False,
                          help='Use text-only ASCII display')
@@ -426,10 +468,16 @@ def parseOptions():
                          help='Manually control agent')
     optParser.add_option('-v', '--valueSteps',action='store_true' ,default=False,
                          help='Display each step of value iteration')
+    optParser.add_option('-c', '--convergence',action='store',
+                         type='float',dest='convergence',default=0.0,
+                         metavar="E", help='Stop value iteration once the greedy policy is within E of optimal (default %default: run all iterations)')
+    optParser.add_option('--sweepLog',action='store', metavar="FILE",
+                         type='string',dest='sweepLog',default=None,
+                         help='Write the per-sweep residual, time, backups and linear solves of value iteration agents to FILE (- for the console)')
 
     opts, args = optParser.parse_args()
 
-    if opts.manual and opts.agent != 'q':
+    if opts.manual and opts.agent not in ('q', 'qlambda', 'sarsalambda'):
         print('## Disabling Agents in Manual Mode (-m) ##')
         opts.agent = None
 
@@ -480,10 +528,12 @@ if __name__ == '__main__':
     ###########################
 
     import valueIterationAgents, qlearningAgents
+    valueAgents = ('value', 'asynchvalue', 'priosweepvalue', 'matrixvalue', 'policy', 'modpolicy')
+    qAgents = ('q', 'qlambda', 'sarsalambda')
     a = None
     if opts.agent == 'value':
-        a = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, opts.iters)
-    elif opts.agent == 'q':
+        a = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, opts.iters, epsilon=opts.convergence)
+    elif opts.agent in qAgents:
         #env.getPossibleActions, opts.discount, opts.learningRate, opts.epsilon
         #simulationFn = lambda agent, state: simulation.GridworldSimulation(agent,state,mdp)
         gridWorldEnv = GridworldEnvironment(mdp)
@@ -492,7 +542,12 @@ if __name__ == '__main__':
                       'alpha': opts.learningRate,
                       'epsilon': opts.epsilon,
                       'actionFn': actionFn}
-        a = qlearningAgents.QLearningAgent(**qLearnOpts)
+        if opts.agent == 'qlambda':
+            a = qlearningAgents.QLambdaAgent(lam=opts.lam, **qLearnOpts)
+        elif opts.agent == 'sarsalambda':
+            a = qlearningAgents.SarsaLambdaAgent(lam=opts.lam, **qLearnOpts)
+        else:
+            a = qlearningAgents.QLearningAgent(**qLearnOpts)
     elif opts.agent == 'random':
         # # No reason to use the random agent without episodes
         if opts.episodes == 0:
@@ -511,19 +566,28 @@ if __name__ == '__main__':
                 pass
         a = RandomAgent()
     elif opts.agent == 'asynchvalue':
-        a = valueIterationAgents.AsynchronousValueIterationAgent(mdp, opts.discount, opts.iters)
+        a = valueIterationAgents.AsynchronousValueIterationAgent(mdp, opts.discount, opts.iters, epsilon=opts.convergence)
     elif opts.agent == 'priosweepvalue':
-        a = valueIterationAgents.PrioritizedSweepingValueIterationAgent(mdp, opts.discount, opts.iters)
+        a = valueIterationAgents.PrioritizedSweepingValueIterationAgent(mdp, opts.discount, opts.iters, epsilon=opts.convergence)
+    elif opts.agent == 'matrixvalue':
+        a = valueIterationAgents.MatrixValueIterationAgent(mdp, opts.discount, opts.iters, epsilon=opts.convergence)
+    elif opts.agent == 'policy':
+        a = valueIterationAgents.PolicyIterationAgent(mdp, opts.discount, opts.iters, epsilon=opts.convergence)
+    elif opts.agent == 'modpolicy':
+        a = valueIterationAgents.ModifiedPolicyIterationAgent(mdp, opts.discount, opts.iters, epsilon=opts.convergence)
     else:
         if not opts.manual: raise Exception('Unknown agent type: '+opts.agent)
 
+    if opts.sweepLog and opts.agent in valueAgents:
+        writeSweepLog(a, opts.sweepLog)
+
 
     ###########################
     # RUN EPISODES
     ###########################
     # DISPLAY Q/V VALUES BEFORE SIMULATION OF EPISODES
     try:
-        if not opts.manual and opts.agent in ('value', 'asynchvalue', 'priosweepvalue'):
+        if not opts.manual and opts.agent in valueAgents:
             if opts.valueSteps:
                 for i in range(opts.iters):
                     tempAgent = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, i)
@@ -545,9 +609,9 @@ if __name__ == '__main__':
         if opts.manual and opts.agent == None:
             displayCallback = lambda state: display.displayNullValues(state)
         else:
-            if opts.agent in ('random', 'value', 'asynchvalue', 'priosweepvalue'):
+            if opts.agent == 'random' or opts.agent in valueAgents:
                 displayCallback = lambda state: display.displayValues(a, state, "CURRENT VALUES")
-            if opts.agent == 'q': displayCallback = lambda state: display.displayQValues(a, state, "CURRENT Q-VALUES")
+            if opts.agent in qAgents: displayCallback = lambda state: display.displayQValues(a, state, "CURRENT Q-VALUES")
 
     messageCallback = lambda x: printString(x)
     if opts.quiet:
@@ -579,7 +643,7 @@ if __name__ == '__main__':
         print()
 
     # DISPLAY POST-LEARNING VALUES / Q-VALUES
-    if opts.agent == 'q' and not opts.manual:
+    if opts.agent in qAgents and not opts.manual:
         try:
             display.displayQValues(a, message = "Q-VALUES AFTER "+str(opts.episodes)+" EPISODES")
             display.pause()
@@ -13,6 +13,7 @@
 
 
 import random
+import util
 
 class MarkovDecisionProcess:
 
@@ -65,3 +66,162 @@ class MarkovDecisionProcess:
         are equivalent.
         """
         abstract
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class CompiledMDP:
+    """
+    A MarkovDecisionProcess compiled once into arrays, so that Bellman
+    backups run as vectorized operations instead of Python calls per state,
+    action and iteration.
+
+    States are indexed in getStates() order and actions in order of first
+    appearance.  For each action index a, the sparse transition matrix
+    P[a][s,s'] and the rewards R[a][s,s'] are stored in coordinate form as
+    parallel arrays (rows[a], cols[a], probs[a], rewards[a]), in the order
+    getTransitionStatesAndProbs lists them.  legal[a, s] marks the actions
+    available in each state.
+    """
+    def __init__(self, mdp):
+        if np is None:
+            raise ImportError('CompiledMDP requires numpy')
+        self.mdp = mdp
+        self.states = list(mdp.getStates())
+        self.stateIndex = dict((s, i) for i, s in enumerate(self.states))
+        self.actions = []
+        self.actionIndex = {}
+        self.stateActions = []
+        entries = []
+        for i, state in enumerate(self.states):
+            actions = tuple(mdp.getPossibleActions(state))
+            self.stateActions.append(actions)
+            for action in actions:
+                if action not in self.actionIndex:
+                    self.actionIndex[action] = len(self.actions)
+                    self.actions.append(action)
+                    entries.append(([], [], [], []))
+                rows, cols, probs, rewards = entries[self.actionIndex[action]]
+                for nextState, prob in mdp.getTransitionStatesAndProbs(state, action):
+                    rows.append(i)
+                    cols.append(self.stateIndex[nextState])
+                    probs.append(prob)
+                    rewards.append(mdp.getReward(state, action, nextState))
+        numStates = len(self.states)
+        self.legal = np.zeros((len(self.actions), numStates), dtype=bool)
+        for i, actions in enumerate(self.stateActions):
+            for action in actions:
+                self.legal[self.actionIndex[action], i] = True
+        self.rows = [np.array(e[0], dtype=int) for e in entries]
+        self.cols = [np.array(e[1], dtype=int) for e in entries]
+        self.probs = [np.array(e[2], dtype=float) for e in entries]
+        self.rewards = [np.array(e[3], dtype=float) for e in entries]
+        self.hasActions = self.legal.any(axis=0)
+
+    def qValues(self, values, discount):
+        """
+        Return the array Q[a, s] of one-step lookahead values under the value
+        vector values.  Illegal (state, action) pairs are -inf.
+        """
+        q = np.full(self.legal.shape, -np.inf)
+        for a in range(len(self.actions)):
+            q[a] = np.bincount(self.rows[a],
+                               weights=self.probs[a] * (self.rewards[a] + discount * values[self.cols[a]]),
+                               minlength=len(self.states))
+        q[~self.legal] = -np.inf
+        return q
+
+    def backup(self, values, discount):
+        """
+        Return (newValues, Q) after one synchronous Bellman backup.  States
+        without actions get value 0.
+        """
+        q = self.qValues(values, discount)
+        newValues = np.where(self.hasActions, q.max(axis=0) if len(self.actions) else 0.0, 0.0)
+        return newValues, q
+
+    def greedyPolicy(self, q):
+        """
+        Return, for each state, the index of the best action under Q, or -1
+        for states without actions.  Ties go to the action that sorts last
+        by name, as with max over (value, action) pairs.
+        """
+        policy = np.full(len(self.states), -1, dtype=int)
+        best = q.max(axis=0) if len(self.actions) else np.zeros(len(self.states))
+        for i, actions in enumerate(self.stateActions):
+            if actions:
+                policy[i] = self.actionIndex[max(a for a in actions
+                                                 if q[self.actionIndex[a], i] == best[i])]
+        return policy
+
+    def policyArrays(self, policy):
+        """
+        Return the Markov chain of a policy (an action index per state, -1 for
+        none) as coordinate arrays (rows, cols, probs) of P_pi together with
+        the expected one-step reward vector r_pi.
+        """
+        rows, cols, probs = [], [], []
+        expected = np.zeros(len(self.states))
+        for a in range(len(self.actions)):
+            chosen = policy[self.rows[a]] == a
+            rows.append(self.rows[a][chosen])
+            cols.append(self.cols[a][chosen])
+            probs.append(self.probs[a][chosen])
+            expected += np.bincount(rows[-1], weights=probs[-1] * self.rewards[a][chosen],
+                                    minlength=len(self.states))
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(probs), expected
+
+    def policyLevels(self, rows, cols, probs):
+        """
+        Split a policy's Markov chain (as returned by policyArrays) into
+        groups of states for Gauss-Seidel sweeps.  Each state's most likely
+        successor is in an earlier group, so one sweep over the groups in
+        order carries values back along whole chains of the policy instead
+        of one step.  States whose chain never ends in a state without
+        actions form the last group.  Returns a list of (states, localRows,
+        cols, probs), where localRows index into states.
+        """
+        n = len(self.states)
+        order = np.lexsort((-probs, rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = rows[order][1:] != rows[order][:-1]
+        successor = np.arange(n)
+        successor[rows[order][first]] = cols[order][first]
+        depth = np.where(self.hasActions, -1, 0)
+        depth[successor == np.arange(n)] = 0
+        level = 0
+        while True:
+            reached = (depth < 0) & (depth[successor] == level)
+            if not reached.any():
+                break
+            level += 1
+            depth[reached] = level
+        depth[depth < 0] = level + 1
+
+        entryDepth = depth[rows]
+        order = np.argsort(entryDepth, kind='stable')
+        rows, cols, probs = rows[order], cols[order], probs[order]
+        bounds = np.searchsorted(entryDepth[order], np.arange(level + 3))
+        levels = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if start < end:
+                states, localRows = np.unique(rows[start:end], return_inverse=True)
+                levels.append((states, localRows, cols[start:end], probs[start:end]))
+        return levels
+
+    def valueVector(self, values):
+        """
+        Convert a dict-like value function to an array in state order.
+        """
+        return np.array([values[s] for s in self.states], dtype=float)
+
+    def valueCounter(self, values):
+        """
+        Convert a value array back into a util.Counter keyed by state.
+        """
+        counter = util.Counter()
+        for state, value in zip(self.states, values.tolist()):
+            counter[state] = value
+        return counter
@@ -77,8 +77,17 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
+    # static variable keeps track of which states have had successors generated.
+    # Tracking is off unless enabled with setExploredTracking, since the set
+    # would otherwise hold on to every state ever generated.
     explored = set()
+    trackExplored = False
+
+    def setExploredTracking(enabled=True):
+        GameState.trackExplored = enabled
+        if not enabled:
+            GameState.explored = set()
+    setExploredTracking = staticmethod(setExploredTracking)
 
     def getAndResetExplored():
         tmp = GameState.explored.copy()
@@ -129,8 +138,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.trackExplored:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions(self):
@@ -554,6 +564,10 @@ def readCommand(argv):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--fastTraining', action='store_true', dest='fastTraining',
+                      help='Play the training games headless, without display, timeouts or state copies', default=False)
+    parser.add_option('--batchSize', dest='batchSize', type='int',
+                      help=default('Number of fast training games between throughput reports'), default=100)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -606,6 +620,8 @@ def readCommand(argv):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['fastTraining'] = options.fastTraining
+    args['batchSize'] = options.batchSize
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -672,10 +688,77 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def runTraining(layout, pacman, ghosts, numEpisodes, batchSize=100):
+    """
+    Plays numEpisodes training games as fast as possible by driving
+    ClassicGameRules directly: no display, no timeouts, no output muting
+    and no state copies for observations, which agents treat as read-only
+    anyway.  Agents see the same sequence of calls as under Game.run, so
+    seeded runs learn exactly what they would have learned there.
+
+    Reports episodes/second and steps/second (Pacman moves) after every
+    batch of batchSize episodes, and returns (episodes, steps, seconds).
+    """
+    import textDisplay
+    rules = ClassicGameRules()
+    display = textDisplay.NullGraphics()
+    agents = [pacman] + ghosts[:layout.getNumGhosts()]
+    numAgents = len(agents)
+    observers = [getattr(agent, 'observationFunction', None) for agent in agents]
+    actors = [agent.getAction for agent in agents]
+    starters = [agent.registerInitialState for agent in agents if hasattr(agent, 'registerInitialState')]
+    finishers = [agent.final for agent in agents if hasattr(agent, 'final')]
+
+    totalSteps = 0
+    startTime = time.time()
+    batchSteps = 0
+    batchStartTime = startTime
+    for episode in range(numEpisodes):
+        game = rules.newGame(layout, pacman, ghosts, display, quiet=True)
+        state = game.state
+        for registerInitialState in starters:
+            registerInitialState(state)
+        agentIndex = 0
+        while not game.gameOver:
+            observe = observers[agentIndex]
+            observation = observe(state) if observe else state
+            action = actors[agentIndex](observation)
+            state = state.generateSuccessor(agentIndex, action)
+            game.state = state
+            rules.process(state, game)
+            if agentIndex == 0:
+                batchSteps += 1
+            agentIndex = (agentIndex + 1) % numAgents
+        for final in finishers:
+            final(state)
+
+        if (episode + 1) % batchSize == 0 or episode + 1 == numEpisodes:
+            now = time.time()
+            batchEpisodes = (episode % batchSize) + 1
+            elapsed = max(now - batchStartTime, 1e-9)
+            totalSteps += batchSteps
+            print('Trained %d/%d episodes: %.1f episodes/s, %.1f steps/s' %
+                  (episode + 1, numEpisodes, batchEpisodes / elapsed, batchSteps / elapsed))
+            batchSteps = 0
+            batchStartTime = now
+
+    seconds = time.time() - startTime
+    if numEpisodes > 0:
+        print('Trained %d episodes (%d steps) in %.2fs: %.1f episodes/s, %.1f steps/s' %
+              (numEpisodes, totalSteps, seconds, numEpisodes / max(seconds, 1e-9), totalSteps / max(seconds, 1e-9)))
+    return numEpisodes, totalSteps, seconds
+
+
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30,
+             fastTraining=False, batchSize=100):
     import __main__
     __main__.__dict__['_display'] = display
 
+    if fastTraining and numTraining > 0:
+        runTraining(layout, pacman, ghosts, numTraining, batchSize)
+        numGames -= numTraining
+        numTraining = 0
+
     rules = ClassicGameRules(timeout)
     games = []
 
@@ -18,6 +18,221 @@ from featureExtractors import *
 
 import random,util,math
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class QTable:
+    """
+      Dense storage for tabular Q-values.
+
+      States and actions are interned to integer ids the first time they
+      are seen, and Q(state, action) lives in a growable 2D array indexed
+      by (state id, action id).  Pairs that were never set read as 0.0.
+
+      Each interned state caches its legal actions and a boolean mask row
+      over action ids, together with its greedy value and action.  The
+      greedy entries are kept current by setQValue, so getValue and
+      getPolicy are constant-time lookups; the row is only rescanned when
+      the greedy action's value drops.  Ties go to the larger action, as
+      with max() over (value, action) tuples.
+
+      Falls back to lists of lists when numpy is not available.
+    """
+    def __init__(self, actionFn, stateCapacity=64, actionCapacity=8):
+        self.actionFn = actionFn
+        self.stateIds = {}
+        self.actionIds = {}
+        self.actions = []
+        self.legalActions = []
+        self.legalIds = []
+        self.bestValues = []
+        self.bestIds = []
+        if np is not None:
+            self.table = np.zeros((stateCapacity, actionCapacity))
+            self.legalMask = np.zeros((stateCapacity, actionCapacity), dtype=bool)
+        else:
+            self.table = []
+            self.legalMask = []
+        self.stateCapacity = stateCapacity
+        self.actionCapacity = actionCapacity
+
+    def getStateId(self, state):
+        """
+          Returns the id of state, interning it (and its legal actions)
+          if it has not been seen before.
+        """
+        stateId = self.stateIds.get(state)
+        if stateId is None:
+            stateId = len(self.legalActions)
+            legalActions = list(self.actionFn(state))
+            ids = [self.getActionId(action) for action in legalActions]
+            if stateId >= self.stateCapacity:
+                self.grow(2 * self.stateCapacity, self.actionCapacity)
+            if np is None:
+                self.table.append([0.0] * self.actionCapacity)
+                self.legalMask.append([False] * self.actionCapacity)
+            for actionId in ids:
+                self.legalMask[stateId][actionId] = True
+            self.stateIds[state] = stateId
+            self.legalActions.append(legalActions)
+            self.legalIds.append(ids)
+            self.bestValues.append(0.0)
+            self.bestIds.append(max(ids, key=self.actions.__getitem__) if ids else None)
+        return stateId
+
+    def getActionId(self, action):
+        actionId = self.actionIds.get(action)
+        if actionId is None:
+            actionId = len(self.actions)
+            self.actionIds[action] = actionId
+            self.actions.append(action)
+            if actionId >= self.actionCapacity:
+                self.grow(self.stateCapacity, 2 * self.actionCapacity)
+        return actionId
+
+    def grow(self, stateCapacity, actionCapacity):
+        if np is not None:
+            rows, cols = self.table.shape
+            table = np.zeros((stateCapacity, actionCapacity))
+            table[:rows, :cols] = self.table
+            legalMask = np.zeros((stateCapacity, actionCapacity), dtype=bool)
+            legalMask[:rows, :cols] = self.legalMask
+            self.table, self.legalMask = table, legalMask
+        else:
+            extra = actionCapacity - self.actionCapacity
+            for row in self.table:
+                row.extend([0.0] * extra)
+            for row in self.legalMask:
+                row.extend([False] * extra)
+        self.stateCapacity = stateCapacity
+        self.actionCapacity = actionCapacity
+
+    def getLegalActions(self, state):
+        return self.legalActions[self.getStateId(state)]
+
+    def getQValue(self, state, action):
+        stateId = self.stateIds.get(state)
+        actionId = self.actionIds.get(action)
+        if stateId is None or actionId is None:
+            return 0.0
+        return self.getEntry(stateId, actionId)
+
+    def setQValue(self, state, action, value):
+        self.setEntry(self.getStateId(state), self.getActionId(action), value)
+
+    def getEntry(self, stateId, actionId):
+        if np is not None:
+            return self.table.item(stateId, actionId)
+        return self.table[stateId][actionId]
+
+    def setEntry(self, stateId, actionId, value):
+        """
+          Sets the Q-value of interned ids, keeping the greedy entries of
+          the state current.
+        """
+        if np is not None:
+            self.table[stateId, actionId] = value
+            legal = self.legalMask.item(stateId, actionId)
+        else:
+            self.table[stateId][actionId] = value
+            legal = self.legalMask[stateId][actionId]
+        if not legal:
+            return
+        bestId = self.bestIds[stateId]
+        bestValue = self.bestValues[stateId]
+        if actionId == bestId:
+            if value >= bestValue:
+                self.bestValues[stateId] = value
+            else:
+                self.rescan(stateId)
+        elif value > bestValue or (value == bestValue and self.actions[actionId] > self.actions[bestId]):
+            self.bestValues[stateId] = value
+            self.bestIds[stateId] = actionId
+
+    def rescan(self, stateId):
+        """
+          Recomputes the greedy value and action of a state from its row.
+        """
+        row = self.table[stateId]
+        bestValue, bestId = None, None
+        for actionId in self.legalIds[stateId]:
+            value = row[actionId]
+            if bestId is None or value > bestValue or \
+               (value == bestValue and self.actions[actionId] > self.actions[bestId]):
+                bestValue, bestId = value, actionId
+        self.bestValues[stateId] = float(bestValue)
+        self.bestIds[stateId] = bestId
+
+    def getValue(self, state):
+        """
+          Returns max_action Q(state, action), or 0.0 with no legal actions.
+        """
+        return self.bestValues[self.getStateId(state)]
+
+    def getPolicy(self, state):
+        """
+          Returns the best legal action, or None with no legal actions.
+        """
+        bestId = self.bestIds[self.getStateId(state)]
+        return None if bestId is None else self.actions[bestId]
+
+class FeatureWeights:
+    """
+      A weight vector over interned features.
+
+      Weights are stored densely by feature id (a growable NumPy array, or a
+      list without numpy), so the vector only ever grows with the feature
+      vocabulary.  Feature vectors are SparseFeatures from the same
+      FeatureIndex.
+    """
+    def __init__(self, capacity=16):
+        self.index = FeatureIndex()
+        if np is not None:
+            self.values = np.zeros(capacity)
+        else:
+            self.values = []
+
+    def encode(self, features):
+        vector = self.index.encode(features)
+        if np is not None:
+            if len(self.index) > len(self.values):
+                values = np.zeros(max(2 * len(self.values), len(self.index)))
+                values[:len(self.values)] = self.values
+                self.values = values
+        else:
+            self.values.extend([0.0] * (len(self.index) - len(self.values)))
+        return vector
+
+    def dot(self, vector):
+        """
+          Returns the dot product of the weights with a feature vector.
+        """
+        values = self.values
+        total = 0
+        if np is not None:
+            for featureId, value in zip(vector.ids, vector.values):
+                total += values.item(featureId) * value
+        else:
+            for featureId, value in zip(vector.ids, vector.values):
+                total += values[featureId] * value
+        return total
+
+    def add(self, vector, scale):
+        """
+          Adds scale times a feature vector to the weights.
+        """
+        values = self.values
+        for featureId, value in zip(vector.ids, vector.values):
+            values[featureId] += scale * value
+
+    def asCounter(self):
+        counter = util.Counter()
+        for featureId, key in enumerate(self.index.keys):
+            counter[key] = float(self.values[featureId])
+        return counter
+
 class QLearningAgent(ReinforcementAgent):
     """
       Q-Learning Agent
@@ -41,7 +256,13 @@ class QLearningAgent(ReinforcementAgent):
     def __init__(self, **args):
         "You can initialize Q-values here..."
         ReinforcementAgent.__init__(self, **args)
-        self.Q = {}
+        self.Q = QTable(self.actionFn)
+
+    def getLegalActions(self, state):
+        """
+          Returns the legal actions for state, computed once per state.
+        """
+        return self.Q.getLegalActions(state)
 
     def getQValue(self, state, action):
         """
@@ -49,7 +270,7 @@ class QLearningAgent(ReinforcementAgent):
           Should return 0.0 if we have never seen a state
           or the Q node value otherwise
         """
-        return self.Q[(state, action)] if (state, action) in self.Q.keys() else 0.0
+        return self.Q.getQValue(state, action)
 
 
     def computeValueFromQValues(self, state):
@@ -61,7 +282,7 @@ class QLearningAgent(ReinforcementAgent):
         """
         if state == 'TERMINAL_STATE':
             return 0
-        return max([self.getQValue(state, a) for a in self.getLegalActions(state)])
+        return self.Q.getValue(state)
 
     def computeActionFromQValues(self, state):
         """
@@ -71,8 +292,7 @@ class QLearningAgent(ReinforcementAgent):
         """
         if state == 'TERMINAL_STATE':
             return None
-        _, action = max([(self.getQValue(state, a), a) for a in self.getLegalActions(state)])
-        return action
+        return self.Q.getPolicy(state)
 
     def getAction(self, state):
         """
@@ -104,10 +324,9 @@ class QLearningAgent(ReinforcementAgent):
           NOTE: You should never call this function,
           it will be called on your behalf
         """
-        nextActions = self.getLegalActions(nextState)
-        maxNextQ = self.discount * max([self.getQValue(nextState, nextAction) for nextAction in nextActions]) if nextActions else 0
+        maxNextQ = self.discount * self.Q.getValue(nextState)
         sample = reward + maxNextQ
-        self.Q[(state, action)] = (1-self.alpha)*self.getQValue(state, action) + self.alpha * sample
+        self.Q.setQValue(state, action, (1-self.alpha)*self.getQValue(state, action) + self.alpha * sample)
 
     def getPolicy(self, state):
         return self.computeActionFromQValues(state)
@@ -155,23 +374,61 @@ class ApproximateQAgent(PacmanQAgent):
        You should only have to overwrite getQValue
        and update.  All other QLearningAgent functions
        should work as is.
+
+       Feature vectors are encoded once per (state, action) and kept for
+       the featureCacheSize most recent states, which covers the repeated
+       queries made by getAction and update within a step.
     """
+    featureCacheSize = 3
+
     def __init__(self, extractor='IdentityExtractor', **args):
         self.featExtractor = util.lookup(extractor, globals())()
         PacmanQAgent.__init__(self, **args)
-        self.weights = util.Counter()
+        self.weights = FeatureWeights()
+        self.featureCache = []
 
     def getWeights(self):
-        return self.weights
+        return self.weights.asCounter()
+
+    def getFeatureVector(self, state, action):
+        """
+          Returns the SparseFeatures of (state, action), encoding them
+          only if they are not cached.
+        """
+        for cachedState, vectors in self.featureCache:
+            if cachedState is state or cachedState == state:
+                break
+        else:
+            vectors = {}
+            self.featureCache.append((state, vectors))
+            if len(self.featureCache) > self.featureCacheSize:
+                del self.featureCache[0]
+        vector = vectors.get(action)
+        if vector is None:
+            vector = self.weights.encode(self.featExtractor.getFeatures(state, action))
+            vectors[action] = vector
+        return vector
+
+    def getLegalActions(self, state):
+        return ReinforcementAgent.getLegalActions(self, state)
+
+    def computeValueFromQValues(self, state):
+        if state == 'TERMINAL_STATE':
+            return 0
+        return max([self.getQValue(state, a) for a in self.getLegalActions(state)])
+
+    def computeActionFromQValues(self, state):
+        if state == 'TERMINAL_STATE':
+            return None
+        _, action = max([(self.getQValue(state, a), a) for a in self.getLegalActions(state)])
+        return action
 
     def getQValue(self, state, action):
         """
           Should return Q(state,action) = w * featureVector
           where * is the dotProduct operator
         """
-        if (state, action) not in self.getWeights().keys():
-            self.weights[(state,action)] = 0
-        return self.featExtractor.getFeatures(state, action) * self.getWeights()
+        return self.weights.dot(self.getFeatureVector(state, action))
 
     def update(self, state, action, nextState, reward):
         """
@@ -180,10 +437,7 @@ class ApproximateQAgent(PacmanQAgent):
         nextActions = self.getLegalActions(nextState)
         maxNextQ = self.discount * max([self.getQValue(nextState, nextAction) for nextAction in nextActions]) if nextActions else 0
         difference = reward + maxNextQ - self.getQValue(state, action)
-        allKeys = self.getWeights().keys()
-        features = self.featExtractor.getFeatures(state, action)
-        for key in features.keys():
-            self.weights[key] += self.alpha*difference*features[key]
+        self.weights.add(self.getFeatureVector(state, action), self.alpha*difference)
 
     def final(self, state):
         "Called at the end of each game."
@@ -194,3 +448,348 @@ class ApproximateQAgent(PacmanQAgent):
         if self.episodesSoFar == self.numTraining:
             # you might want to print your weights here for debugging
             print(self.getWeights())
+
+
+class ReplayBuffer:
+    """
+      A fixed-capacity ring buffer of transitions for linear Q-learning.
+
+      Each transition is stored as NumPy rows: the SparseFeatures of the
+      (state, action) taken, padded to a common width, the reward, and a
+      block with the feature vectors of every legal action in the next
+      state, together with a mask of which rows of the block are used.
+      Rows are padded with feature id 0 and value 0.0, which contributes
+      nothing to dot products or gradients.  The width and the number of
+      next actions grow as needed.
+
+      With prioritized sampling, transitions are drawn with probability
+      proportional to (|TD error| + epsilon) ** priorityExponent, new
+      transitions enter at the largest priority seen so far, and sample
+      also returns the importance-sampling weights that correct for it.
+      Priorities are stored already raised to priorityExponent.
+    """
+    def __init__(self, capacity, prioritized=False, priorityExponent=0.6, epsilon=1e-3):
+        if np is None:
+            raise ImportError('ReplayBuffer requires numpy')
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.priorityExponent = priorityExponent
+        self.epsilon = epsilon
+        self.size = 0
+        self.position = 0
+        self.ids = np.zeros((capacity, 1), dtype=int)
+        self.values = np.zeros((capacity, 1))
+        self.rewards = np.zeros(capacity)
+        self.nextIds = np.zeros((capacity, 1, 1), dtype=int)
+        self.nextValues = np.zeros((capacity, 1, 1))
+        self.nextLegal = np.zeros((capacity, 1), dtype=bool)
+        self.priorities = np.zeros(capacity)
+        self.maxPriority = 1.0
+
+    def __len__(self):
+        return self.size
+
+    def reserve(self, width, numActions):
+        """
+          Pads the arrays so rows hold width features and blocks hold
+          numActions next actions.
+        """
+        oldWidth, oldActions = self.ids.shape[1], self.nextLegal.shape[1]
+        if width <= oldWidth and numActions <= oldActions:
+            return
+        width, numActions = max(width, oldWidth), max(numActions, oldActions)
+        pad = ((0, 0), (0, width - oldWidth))
+        self.ids = np.pad(self.ids, pad)
+        self.values = np.pad(self.values, pad)
+        pad = ((0, 0), (0, numActions - oldActions), (0, width - oldWidth))
+        self.nextIds = np.pad(self.nextIds, pad)
+        self.nextValues = np.pad(self.nextValues, pad)
+        self.nextLegal = np.pad(self.nextLegal, ((0, 0), (0, numActions - oldActions)))
+
+    def add(self, vector, reward, nextVectors):
+        """
+          Stores a transition, overwriting the oldest once full.
+        """
+        self.reserve(max([len(vector)] + [len(v) for v in nextVectors]), len(nextVectors))
+        i = self.position
+        self.ids[i] = 0
+        self.values[i] = 0.0
+        self.ids[i, :len(vector)] = vector.ids
+        self.values[i, :len(vector)] = vector.values
+        self.rewards[i] = reward
+        self.nextIds[i] = 0
+        self.nextValues[i] = 0.0
+        self.nextLegal[i] = False
+        for a, nextVector in enumerate(nextVectors):
+            self.nextIds[i, a, :len(nextVector)] = nextVector.ids
+            self.nextValues[i, a, :len(nextVector)] = nextVector.values
+            self.nextLegal[i, a] = True
+        self.priorities[i] = self.maxPriority
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batchSize, randomState, importanceExponent=0.4):
+        """
+          Returns (indices, weights) of a minibatch: weights are the
+          normalized importance-sampling weights, or all ones without
+          prioritization.
+        """
+        if not self.prioritized:
+            return randomState.randint(self.size, size=batchSize), np.ones(batchSize)
+        cumulative = np.cumsum(self.priorities[:self.size])
+        total = cumulative[-1]
+        indices = np.searchsorted(cumulative, randomState.uniform(0, total, batchSize), side='right')
+        indices = np.minimum(indices, self.size - 1)
+        weights = (self.size * self.priorities[indices] / total) ** -importanceExponent
+        return indices, weights / weights.max()
+
+    def getTDErrors(self, indices, weights, discount):
+        """
+          Returns r + discount * max_a' Q(s', a') - Q(s, a) for the
+          transitions at indices, under the weight array weights.
+        """
+        values = (weights[self.ids[indices]] * self.values[indices]).sum(1)
+        legal = self.nextLegal[indices]
+        nextValues = (weights[self.nextIds[indices]] * self.nextValues[indices]).sum(2)
+        nextValues = np.where(legal, nextValues, -np.inf).max(1)
+        nextValues[~legal.any(1)] = 0.0
+        return self.rewards[indices] + discount * nextValues - values
+
+    def getGradient(self, indices, scales, numFeatures):
+        """
+          Returns the sum over the transitions at indices of scale times
+          their feature vector, as a dense array of numFeatures weights.
+        """
+        return np.bincount(self.ids[indices].ravel(),
+                           weights=(self.values[indices] * scales[:, None]).ravel(),
+                           minlength=numFeatures)
+
+    def updatePriorities(self, indices, errors):
+        priorities = (np.abs(errors) + self.epsilon) ** self.priorityExponent
+        self.priorities[indices] = priorities
+        self.maxPriority = max(self.maxPriority, priorities.max())
+
+
+class ApproximateReplayQAgent(ApproximateQAgent):
+    """
+       ApproximateQAgent that learns from experience replay.
+
+       Every observed transition goes into a ReplayBuffer.  Once it holds
+       batchSize transitions, each step samples a minibatch (uniformly, or
+       by TD error with prioritized=True) and applies the averaged
+       Q-learning update of the whole batch to the weights in one
+       vectorized step.
+    """
+    def __init__(self, replayCapacity=10000, batchSize=32, prioritized=False,
+                 priorityExponent=0.6, importanceExponent=0.4, **args):
+        ApproximateQAgent.__init__(self, **args)
+        self.batchSize = int(batchSize)
+        self.importanceExponent = float(importanceExponent)
+        self.replay = ReplayBuffer(int(replayCapacity), str(prioritized).lower() in ('1', 'true'),
+                                   float(priorityExponent))
+        self.randomState = np.random.RandomState(random.getrandbits(32))
+
+    def update(self, state, action, nextState, reward):
+        """
+           Stores the transition and replays a minibatch
+        """
+        if self.alpha == 0:
+            return
+        nextVectors = [self.getFeatureVector(nextState, nextAction)
+                       for nextAction in self.getLegalActions(nextState)]
+        self.replay.add(self.getFeatureVector(state, action), reward, nextVectors)
+        if len(self.replay) >= self.batchSize:
+            self.replayBatch()
+
+    def replayBatch(self):
+        indices, weights = self.replay.sample(self.batchSize, self.randomState, self.importanceExponent)
+        errors = self.replay.getTDErrors(indices, self.weights.values, self.discount)
+        scales = (self.alpha / self.batchSize) * weights * errors
+        self.weights.values += self.replay.getGradient(indices, scales, len(self.weights.values))
+        if self.replay.prioritized:
+            self.replay.updatePriorities(indices, errors)
+
+
+class EligibilityTraces:
+    """
+      Sparse accumulating eligibility traces.
+
+      Only live traces are stored, keyed by whatever the agent updates (a
+      (state, action) pair or a feature id).  Decay is lazy: every trace
+      shares one scale factor, so decaying is O(1), and traces whose
+      magnitude falls below threshold are pruned while they are visited.
+    """
+    def __init__(self, threshold=1e-4):
+        self.threshold = threshold
+        self.traces = {}
+        self.scale = 1.0
+
+    def __len__(self):
+        return len(self.traces)
+
+    def clear(self):
+        self.traces = {}
+        self.scale = 1.0
+
+    def accumulate(self, key, amount=1.0):
+        traces = self.traces
+        traces[key] = traces.get(key, 0.0) + amount / self.scale
+
+    def decay(self, factor):
+        """
+          Multiplies every trace by factor.
+        """
+        if factor <= 0 or not self.traces:
+            self.clear()
+            return
+        self.scale *= factor
+        if self.scale < 1e-100:
+            for key in self.traces:
+                self.traces[key] *= self.scale
+            self.scale = 1.0
+
+    def items(self):
+        """
+          Returns the (key, trace) pairs of the live traces, pruning the
+          rest.
+        """
+        scale, threshold = self.scale, self.threshold
+        live, dead = [], []
+        for key, stored in self.traces.items():
+            trace = stored * scale
+            if abs(trace) < threshold:
+                dead.append(key)
+            else:
+                live.append((key, trace))
+        for key in dead:
+            del self.traces[key]
+        return live
+
+
+class QLambdaAgent(QLearningAgent):
+    """
+      Watkins's Q(lambda) with tabular Q-values.
+
+      Each update spreads the one-step TD error to every recently visited
+      (state, action) pair in proportion to its eligibility trace.  Traces
+      decay by gamma * lambda per step and are cut whenever the agent
+      takes an exploratory (non-greedy) action.
+
+      Subclasses choose what the traces are kept over by overriding
+      getGradient and applyUpdate.
+    """
+    def __init__(self, lam=0.9, traceThreshold=1e-4, **args):
+        self.lam = float(lam)
+        self.traces = EligibilityTraces(float(traceThreshold))
+        super(QLambdaAgent, self).__init__(**args)
+
+    def startEpisode(self):
+        super(QLambdaAgent, self).startEpisode()
+        self.traces.clear()
+
+    def getGradient(self, state, action):
+        """
+          Returns (key, gradient) pairs of Q(state, action) with respect
+          to the parameters traces are kept over; here the interned
+          (state id, action id) of the Q-table entry.
+        """
+        return (((self.Q.getStateId(state), self.Q.getActionId(action)), 1.0),)
+
+    def applyUpdate(self, key, amount):
+        stateId, actionId = key
+        self.Q.setEntry(stateId, actionId, self.Q.getEntry(stateId, actionId) + amount)
+
+    def getNextValue(self, nextState):
+        if not self.getLegalActions(nextState):
+            return 0.0
+        return self.computeValueFromQValues(nextState)
+
+    def getAction(self, state):
+        action = super(QLambdaAgent, self).getAction(state)
+        if action is not None and self.getQValue(state, action) < self.computeValueFromQValues(state):
+            self.traces.clear()
+        return action
+
+    def update(self, state, action, nextState, reward):
+        self.updateTraces(state, action, reward + self.discount * self.getNextValue(nextState))
+
+    def updateTraces(self, state, action, target):
+        """
+          Moves Q(state, action) and every eligible parameter towards
+          target, then decays the traces.
+        """
+        delta = target - self.getQValue(state, action)
+        for key, gradient in self.getGradient(state, action):
+            self.traces.accumulate(key, gradient)
+        step = self.alpha * delta
+        for key, trace in self.traces.items():
+            self.applyUpdate(key, step * trace)
+        self.traces.decay(self.discount * self.lam)
+
+
+class SarsaLambdaAgent(QLambdaAgent):
+    """
+      On-policy SARSA(lambda).
+
+      The TD target uses the action actually taken next, so the update for
+      a transition is held back until getAction picks that action (or
+      applied at once when the next state has no legal actions).  Traces
+      are never cut on exploration.
+    """
+    pending = None
+
+    def startEpisode(self):
+        super(SarsaLambdaAgent, self).startEpisode()
+        self.pending = None
+
+    def getAction(self, state):
+        action = super(QLambdaAgent, self).getAction(state)
+        self.applyPending(state, action)
+        return action
+
+    def update(self, state, action, nextState, reward):
+        self.applyPending()
+        if not self.getLegalActions(nextState):
+            self.updateTraces(state, action, reward)
+        else:
+            self.pending = (state, action, nextState, reward)
+
+    def applyPending(self, nextState=None, nextAction=None):
+        """
+          Applies the held-back update, if any, using nextAction in
+          nextState, or the greedy value when those are not known.
+        """
+        pending, self.pending = self.pending, None
+        if pending is None:
+            return
+        state, action, pendingState, reward = pending
+        if nextAction is not None and (pendingState is nextState or pendingState == nextState):
+            nextValue = self.getQValue(nextState, nextAction)
+        else:
+            nextValue = self.getNextValue(pendingState)
+        self.updateTraces(state, action, reward + self.discount * nextValue)
+
+
+class PacmanQLambdaAgent(QLambdaAgent, PacmanQAgent):
+    "Tabular Q(lambda) with PacmanQAgent's default parameters"
+
+
+class PacmanSarsaLambdaAgent(SarsaLambdaAgent, PacmanQAgent):
+    "Tabular SARSA(lambda) with PacmanQAgent's default parameters"
+
+
+class ApproximateQLambdaAgent(QLambdaAgent, ApproximateQAgent):
+    """
+       Q(lambda) over the weights of ApproximateQAgent: traces are kept
+       per feature id and accumulate feature values.
+    """
+    def getGradient(self, state, action):
+        vector = self.getFeatureVector(state, action)
+        return zip(vector.ids, vector.values)
+
+    def applyUpdate(self, featureId, amount):
+        self.weights.values[featureId] += amount
+
+
+class ApproximateSarsaLambdaAgent(SarsaLambdaAgent, ApproximateQLambdaAgent):
+    "SARSA(lambda) over the weights of ApproximateQAgent"
@@ -977,3 +977,48 @@ class GridPolicyTest(testClasses.TestCase):
             handle.write('# File intentionally blank.\n')
         return True
 
+
+
+class SolverBackupsTest(testClasses.TestCase):
+    """
+    Runs a solver and ValueIterationAgent, with the same epsilon, on a grid
+    generated by gridworld.getLargeGrid.  The solver passes if it converges
+    to the same values within maxBackupRatio times the state backups that
+    value iteration needs.
+    """
+
+    def __init__(self, question, testDict):
+        super(SolverBackupsTest, self).__init__(question, testDict)
+        self.grid = gridworld.getLargeGrid(int(testDict['width']), int(testDict['height']), int(testDict['seed']))
+        self.grid.setNoise(float(testDict['noise']))
+        self.discount = float(testDict['discount'])
+        self.iterations = int(testDict['iterations'])
+        self.epsilon = float(testDict['epsilon'])
+        self.agentClass = testDict['agentClass']
+        self.maxBackupRatio = float(testDict['maxBackupRatio'])
+        self.valueTolerance = float(testDict['valueTolerance'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        agents = moduleDict['valueIterationAgents']
+        reference = agents.ValueIterationAgent(self.grid, self.discount, self.iterations, epsilon=self.epsilon)
+        solver = getattr(agents, self.agentClass)(self.grid, self.discount, self.iterations)
+        referenceBackups = reference.sweepLog[-1].backups
+        backups = solver.sweepLog[-1].backups
+        self.addMessage('%s: %d backups, ValueIterationAgent: %d backups' % (self.agentClass, backups, referenceBackups))
+        if not solver.converged:
+            self.addMessage('%s did not converge in %d iterations' % (self.agentClass, self.iterations))
+            return self.testFail(grades)
+        if backups > self.maxBackupRatio * referenceBackups:
+            self.addMessage('%s used more than %g times the backups of ValueIterationAgent' % (self.agentClass, self.maxBackupRatio))
+            return self.testFail(grades)
+        error = max(abs(solver.getValue(state) - reference.getValue(state)) for state in self.grid.getStates())
+        if error > self.valueTolerance:
+            self.addMessage('%s values differ from ValueIterationAgent by up to %g' % (self.agentClass, error))
+            return self.testFail(grades)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        with open(filePath, 'w') as handle:
+            handle.write('# This is the solution file for %s.\n' % self.path)
+            handle.write('# File intentionally blank.\n')
+        return True
@@ -30,6 +30,24 @@ import mdp, util
 
 from learningAgents import ValueEstimationAgent
 import collections
+import time
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import scipy.sparse, scipy.sparse.linalg
+except ImportError:
+    scipy = None
+
+# One entry of a value iteration agent's sweepLog: the sweep number, the
+# largest value change (Bellman residual) in that sweep, and the wall time,
+# state backups and exact linear solves (of policy evaluation) spent since
+# the agent started.  A solve is not counted as backups, so compare both.
+SweepRecord = collections.namedtuple('SweepRecord', 'sweep residual seconds backups solves')
 
 class ValueIterationAgent(ValueEstimationAgent):
     """
@@ -39,8 +57,13 @@ class ValueIterationAgent(ValueEstimationAgent):
         (see mdp.py) on initialization and runs value iteration
         for a given number of iterations using the supplied
         discount factor.
+
+        With epsilon > 0 it stops early, once the Bellman residual
+        guarantees that the greedy policy is within epsilon of optimal
+        (see convergenceThreshold).  Every sweep is recorded in
+        self.sweepLog as a SweepRecord.
     """
-    def __init__(self, mdp, discount = 0.9, iterations = 100):
+    def __init__(self, mdp, discount = 0.9, iterations = 100, epsilon = 0.0):
         """
           Your value iteration agent should take an mdp on
           construction, run the indicated number of iterations
@@ -56,20 +79,74 @@ class ValueIterationAgent(ValueEstimationAgent):
         self.mdp = mdp
         self.discount = discount
         self.iterations = iterations
+        self.epsilon = float(epsilon)
         self.values = util.Counter() # A Counter is a dict with default 0
+        self.sweepLog = []
+        self.converged = False
+        self.startTime = time.time()
         self.runValueIteration()
 
     def runValueIteration(self):
         # Write value iteration code here
         for _ in range(self.iterations):
             newValues = util.Counter()
-            for state in self.mdp.getStates():
+            residual = 0.0
+            states = self.mdp.getStates()
+            for state in states:
                 if state == 'TERMINAL_STATE':
                     newValues['TERMINAL_STATE'] = 0
                     continue
                 actions = self.mdp.getPossibleActions(state)
                 newValues[state] = max([self.computeQValueFromValues(state, action) for action in actions])
+                residual = max(residual, abs(newValues[state] - self.values[state]))
             self.values = newValues
+            self.recordSweep(residual, len(states))
+            if self.isConverged(residual):
+                break
+
+    def recordSweep(self, residual, backups, solves = 0):
+        """
+          Append a SweepRecord for a sweep that made the given number of
+          state backups and linear solves, and whose largest value change
+          was residual.
+        """
+        last = self.sweepLog[-1] if self.sweepLog else None
+        self.sweepLog.append(SweepRecord(len(self.sweepLog) + 1, residual,
+                                         time.time() - self.startTime,
+                                         backups + (last.backups if last else 0),
+                                         solves + (last.solves if last else 0)))
+
+    def convergenceThreshold(self):
+        """
+          Return the Bellman residual below which to stop, or None when
+          epsilon is not set.  If a sweep changes no value by more than
+          epsilon * (1 - discount) / (2 * discount), the greedy policy for
+          the new values loses at most epsilon against the optimal policy.
+          Without discounting there is no such bound, and epsilon is used as
+          a plain residual threshold.
+        """
+        if self.epsilon <= 0:
+            return None
+        if self.discount >= 1:
+            return self.epsilon
+        if self.discount <= 0:
+            return float('inf')
+        return self.epsilon * (1 - self.discount) / (2 * self.discount)
+
+    def isConverged(self, residual):
+        threshold = self.convergenceThreshold()
+        self.converged = threshold is not None and residual < threshold
+        return self.converged
+
+    def getPolicyLossBound(self):
+        """
+          Return the bound 2 * discount * residual / (1 - discount) on how much
+          the greedy policy can lose against the optimal policy, given the
+          last sweep's residual, or None if it does not apply.
+        """
+        if not self.sweepLog or self.discount >= 1:
+            return None
+        return 2 * self.discount * self.sweepLog[-1].residual / (1 - self.discount)
 
     def getValue(self, state):
         """
@@ -124,7 +201,7 @@ class AsynchronousValueIterationAgent(ValueIterationAgent):
         for a given number of iterations using the supplied
         discount factor.
     """
-    def __init__(self, mdp, discount = 0.9, iterations = 1000):
+    def __init__(self, mdp, discount = 0.9, iterations = 1000, epsilon = 0.0):
         """
           Your cyclic value iteration agent should take an mdp on
           construction, run the indicated number of iterations,
@@ -140,20 +217,28 @@ class AsynchronousValueIterationAgent(ValueIterationAgent):
               mdp.getReward(state)
               mdp.isTerminal(state)
         """
-        ValueIterationAgent.__init__(self, mdp, discount, iterations)
+        ValueIterationAgent.__init__(self, mdp, discount, iterations, epsilon)
 
     def runValueIteration(self):
+        states = self.mdp.getStates()
+        stateActions = dict((state, self.mdp.getPossibleActions(state)) for state in states)
         i = 0
         while i < self.iterations:
-            for state in self.mdp.getStates():
+            residual, backups = 0.0, 0
+            for state in states:
                 if i >= self.iterations:
                     break
                 i+=1
                 if state == 'TERMINAL_STATE':
                     self.values['TERMINAL_STATE'] = 0
                     continue
-                actions = self.mdp.getPossibleActions(state)
-                self.values[state] = max([self.computeQValueFromValues(state, action) for action in actions])
+                oldValue = self.values[state]
+                self.values[state] = max([self.computeQValueFromValues(state, action) for action in stateActions[state]])
+                residual = max(residual, abs(self.values[state] - oldValue))
+                backups += 1
+            self.recordSweep(residual, backups)
+            if self.isConverged(residual):
+                break
 
 class PrioritizedSweepingValueIterationAgent(AsynchronousValueIterationAgent):
     """
@@ -162,22 +247,30 @@ class PrioritizedSweepingValueIterationAgent(AsynchronousValueIterationAgent):
         A PrioritizedSweepingValueIterationAgent takes a Markov decision process
         (see mdp.py) on initialization and runs prioritized sweeping value iteration
         for a given number of iterations using the supplied parameters.
+
+        With epsilon > 0, theta is set to the convergence threshold, so the
+        queue empties once the greedy policy is epsilon-optimal.  Every
+        len(states) updates are recorded in sweepLog as one sweep.
     """
-    def __init__(self, mdp, discount = 0.9, iterations = 100, theta = 1e-5):
+    def __init__(self, mdp, discount = 0.9, iterations = 100, theta = 1e-5, epsilon = 0.0):
         """
           Your prioritized sweeping value iteration agent should take an mdp on
           construction, run the indicated number of iterations,
           and then act according to the resulting policy.
         """
         self.theta = theta
-        ValueIterationAgent.__init__(self, mdp, discount, iterations)
+        ValueIterationAgent.__init__(self, mdp, discount, iterations, epsilon)
 
     def runValueIteration(self):
+        if self.convergenceThreshold() is not None:
+            self.theta = self.convergenceThreshold()
+
         # Compute predecessors of all states.
         predecessors = {}
         states = [s for s in self.mdp.getStates() if s != 'TERMINAL_STATE']
+        stateActions = dict((state, self.mdp.getPossibleActions(state)) for state in states)
         for state in states:
-            actions = self.mdp.getPossibleActions(state)
+            actions = stateActions[state]
             for action in actions:
                 transitionStates = [s for s,_ in self.mdp.getTransitionStatesAndProbs(state, action)]
                 for nextState in transitionStates:
@@ -191,7 +284,7 @@ class PrioritizedSweepingValueIterationAgent(AsynchronousValueIterationAgent):
         # For each non-terminal state s, do:
         for s in states:
             # Find the absolute value of the difference between the current value of s in self.values and the highest Q-value across all possible actions from s
-            actions = self.mdp.getPossibleActions(s)
+            actions = stateActions[s]
             maxQ = max([self.computeQValueFromValues(s, action) for action in actions])
             diff = abs(self.values[s] - maxQ)
 
@@ -199,25 +292,203 @@ class PrioritizedSweepingValueIterationAgent(AsynchronousValueIterationAgent):
             pq.push(s, -diff)
 
         # For iteration in 0, 1, 2, ..., self.iterations - 1, do:
+        residual, backups = 0.0, 0
         for _ in range(self.iterations):
             # If the priority queue is empty, then terminate.
             if pq.isEmpty():
+                self.converged = True
                 break
 
             # Pop a state s off the priority queue.
             s = pq.pop()
 
             # Update s's value (if it is not a terminal state) in self.values.
-            actions = self.mdp.getPossibleActions(s)
+            actions = stateActions[s]
+            oldValue = self.values[s]
             self.values[s] = max([self.computeQValueFromValues(s, action) for action in actions])
+            residual = max(residual, abs(self.values[s] - oldValue))
+            backups += 1
+            if backups == len(states):
+                self.recordSweep(residual, backups)
+                residual, backups = 0.0, 0
 
             # For each predecessor p of s, do:
             for p in predecessors[s]:
                 # Find the absolute value of the difference between the current value of p in self.values and the highest Q-value across all possible actions from p (this represents what the value should be); call this number diff.
-                actions = self.mdp.getPossibleActions(p)
+                actions = stateActions[p]
                 maxQ = max([self.computeQValueFromValues(p, action) for action in actions])
                 diff = abs(self.values[p] - maxQ)
 
                 # If diff > theta, push p into the priority queue with priority -diff (note that this is negative), as long as it does not already exist in the priority queue with equal or lower priority.
                 if diff > self.theta:
                     pq.update(p, -diff)
+        if backups:
+            self.recordSweep(residual, backups)
+
+    def getPolicyLossBound(self):
+        """
+          Once the queue has emptied, every Bellman error is at most theta.
+        """
+        if not self.converged or self.discount >= 1:
+            return None
+        return 2 * self.discount * self.theta / (1 - self.discount)
+
+class MatrixValueIterationAgent(ValueIterationAgent):
+    """
+        A MatrixValueIterationAgent runs the same synchronous value
+        iteration as ValueIterationAgent, but on an mdp.CompiledMDP:
+        each sweep is a vectorized Bellman backup over sparse transition
+        arrays instead of Python calls per state and action.  It stops
+        early once no value changes by more than tolerance, or on the
+        epsilon criterion of ValueIterationAgent.
+    """
+    def __init__(self, mdp, discount = 0.9, iterations = 100, tolerance = 0.0, epsilon = 0.0):
+        self.tolerance = float(tolerance)
+        ValueIterationAgent.__init__(self, mdp, discount, iterations, epsilon)
+
+    def runValueIteration(self):
+        self.compiled = compiled = mdp.CompiledMDP(self.mdp)
+        values = np.zeros(len(compiled.states))
+        for _ in range(self.iterations):
+            newValues, _ = compiled.backup(values, self.discount)
+            residual = self.getResidual(values, newValues)
+            values = newValues
+            self.recordSweep(residual, len(values))
+            if self.isConverged(residual):
+                break
+        self.setValueVector(values)
+
+    def getResidual(self, values, newValues):
+        return float(abs(newValues - values).max()) if len(values) else 0.0
+
+    def isConverged(self, residual):
+        if residual <= self.tolerance:
+            self.converged = True
+            return True
+        return ValueIterationAgent.isConverged(self, residual)
+
+    def setValueVector(self, values):
+        """
+          Store a value array, with its Q-values and greedy policy.
+        """
+        self.valueVector = values
+        self.values = self.compiled.valueCounter(values)
+        self.qTable = self.compiled.qValues(values, self.discount)
+        self.policyVector = self.compiled.greedyPolicy(self.qTable)
+
+    def computeQValueFromValues(self, state, action):
+        return float(self.qTable[self.compiled.actionIndex[action], self.compiled.stateIndex[state]])
+
+    def computeActionFromValues(self, state):
+        a = self.policyVector[self.compiled.stateIndex[state]]
+        if a < 0:
+            return None
+        return self.compiled.actions[a]
+
+class PolicyIterationAgent(MatrixValueIterationAgent):
+    """
+        A PolicyIterationAgent alternates exact policy evaluation, a sparse
+        linear solve of (I - discount * P_pi) V = r_pi, with greedy policy
+        improvement, for at most the given number of iterations.  It stops
+        as soon as the policy is stable, or once a greedy backup meets the
+        tolerance or epsilon criterion of MatrixValueIterationAgent.  An
+        action only changes when another action is better by more than a
+        relative tolerance, so ties and rounding cannot make it cycle.
+    """
+    def __init__(self, mdp, discount = 0.9, iterations = 100, tolerance = 1e-9, epsilon = 0.0):
+        MatrixValueIterationAgent.__init__(self, mdp, discount, iterations, tolerance, epsilon)
+
+    def runValueIteration(self):
+        self.compiled = compiled = mdp.CompiledMDP(self.mdp)
+        values = np.zeros(len(compiled.states))
+        newValues, q = compiled.backup(values, self.discount)
+        policy = compiled.greedyPolicy(q)
+        self.recordSweep(self.getResidual(values, newValues), len(values))
+        for _ in range(self.iterations):
+            self.evaluationBackups = 0
+            self.evaluationSolves = 0
+            # The greedy backup already applied the new policy once, so
+            # evaluation starts from its result
+            values = self.evaluatePolicy(policy, newValues)
+            newValues, q = compiled.backup(values, self.discount)
+            residual = self.getResidual(values, newValues)
+            self.recordSweep(residual, self.evaluationBackups + len(values), self.evaluationSolves)
+            policy, changed = self.improvePolicy(policy, q)
+            if not changed or self.isConverged(residual):
+                self.converged = True
+                break
+        self.setValueVector(values)
+
+    def evaluatePolicy(self, policy, values):
+        """
+          Return the exact value of policy.  Falls back to iterative
+          evaluation if the system is singular (a policy that never
+          terminates when discount = 1).
+        """
+        rows, cols, probs, rewards = self.compiled.policyArrays(policy)
+        n = len(self.compiled.states)
+        self.evaluationSolves += 1
+        if scipy is not None:
+            matrix = scipy.sparse.identity(n, format='csr') - self.discount * \
+                scipy.sparse.csr_matrix((probs, (rows, cols)), shape=(n, n))
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                solution = scipy.sparse.linalg.spsolve(matrix.tocsc(), rewards)
+        else:
+            matrix = np.identity(n)
+            np.add.at(matrix, (rows, cols), -self.discount * probs)
+            try:
+                solution = np.linalg.solve(matrix, rewards)
+            except np.linalg.LinAlgError:
+                solution = None
+        if solution is None or not np.all(np.isfinite(solution)):
+            return self.sweepPolicy(rows, cols, probs, rewards, values, self.iterations)
+        return solution
+
+    def sweepPolicy(self, rows, cols, probs, rewards, values, sweeps):
+        """
+          Apply the policy's Bellman operator to values the given number of times.
+        """
+        n = len(values)
+        for _ in range(sweeps):
+            values = rewards + self.discount * np.bincount(rows, weights=probs * values[cols], minlength=n)
+        self.evaluationBackups += sweeps * n
+        return values
+
+    def improvePolicy(self, policy, q):
+        """
+          Return the greedy policy under q, keeping the current action
+          wherever it is within a relative tolerance of the best, and whether
+          anything changed.
+        """
+        states = np.arange(len(policy))
+        best = np.where(self.compiled.hasActions, q.max(axis=0), 0.0)
+        current = np.where(policy >= 0, q[np.maximum(policy, 0), states], best)
+        improve = best - current > self.tolerance * abs(best)
+        newPolicy = np.where(improve, self.compiled.greedyPolicy(q), policy)
+        return newPolicy, bool(improve.any())
+
+class ModifiedPolicyIterationAgent(PolicyIterationAgent):
+    """
+        A ModifiedPolicyIterationAgent replaces exact evaluation with
+        evaluationSweeps Gauss-Seidel applications of the policy's Bellman
+        operator, warm-started from the greedy backup.  Each sweep visits
+        the states in the order of mdp.CompiledMDP.policyLevels, so values
+        travel along the policy's chains instead of one state per sweep.
+        It stops like PolicyIterationAgent, once the greedy policy no
+        longer changes after an evaluation phase.
+    """
+    def __init__(self, mdp, discount = 0.9, iterations = 100, evaluationSweeps = 2, tolerance = 1e-6, epsilon = 0.0):
+        self.evaluationSweeps = int(evaluationSweeps)
+        PolicyIterationAgent.__init__(self, mdp, discount, iterations, tolerance, epsilon)
+
+    def evaluatePolicy(self, policy, values):
+        rows, cols, probs, rewards = self.compiled.policyArrays(policy)
+        values = values.copy()
+        levels = self.compiled.policyLevels(rows, cols, probs)
+        for _ in range(self.evaluationSweeps):
+            for states, localRows, levelCols, levelProbs in levels:
+                values[states] = rewards[states] + self.discount * np.bincount(
+                    localRows, weights=levelProbs * values[levelCols], minlength=len(states))
+        self.evaluationBackups += self.evaluationSweeps * len(values)
+        return values
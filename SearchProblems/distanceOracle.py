@@ -0,0 +1,133 @@
+# distanceOracle.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A shared maze-distance oracle, one per wall layout.
+
+Distances are computed lazily: the first query from a source runs a single
+BFS over the open cells and the whole distance map from that source is kept,
+so every later query from (or, since moves are reversible, to) that cell is a
+dictionary lookup.  At most maxSources maps are kept, evicting the least
+recently used one.  precompute() fills a separate all-pairs table at once.
+
+getOracle keeps the oracles of the maxLayouts most recently used layouts.
+
+Example:
+oracle = getOracle(gameState.getWalls())
+oracle.getDistance( (1,1), (10,10) )
+"""
+
+import collections
+
+class MazeDistanceOracle:
+    def __init__(self, walls, maxSources=512):
+        """
+        walls: the Grid of walls of a layout
+        maxSources: how many single-source distance maps to keep, or None to
+                    keep them all
+        """
+        self.walls = walls.copy()
+        self.maxSources = maxSources
+        self._sources = collections.OrderedDict()
+        self._allPairs = None
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open cells, or None if pos2 can
+        not be reached from pos1.
+        """
+        if pos2 in self._sources and pos1 not in self._sources:
+            pos1, pos2 = pos2, pos1
+        return self.distancesFrom(pos1).get(pos2)
+
+    def getMazeDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open cells, or 0 if pos2 can not
+        be reached from pos1, which is the length of the empty path search.bfs
+        reports then.
+        """
+        distance = self.getDistance(pos1, pos2)
+        if distance is None:
+            return 0
+        return distance
+
+    def distancesFrom(self, source):
+        """
+        Returns a dictionary mapping every cell reachable from source to its
+        maze distance.  The dictionary is shared; do not modify it.
+        """
+        if self._allPairs is not None and source in self._allPairs:
+            return self._allPairs[source]
+        distances = self._sources.get(source)
+        if distances is not None:
+            self._sources.move_to_end(source)
+            return distances
+        distances = self._bfs(source)
+        self._sources[source] = distances
+        if self.maxSources is not None and len(self._sources) > self.maxSources:
+            self._sources.popitem(last=False)
+        return distances
+
+    def precompute(self):
+        """
+        Computes the distances between all pairs of open cells into a table
+        of its own, leaving the least recently used maps and their limit as
+        they are.
+        """
+        if self._allPairs is None:
+            self._allPairs = dict((source, self._sources.get(source) or self._bfs(source))
+                                  for source in self.walls.asList(False))
+
+    def _bfs(self, source):
+        walls = self.walls
+        distances = {source: 0}
+        queue = collections.deque([source])
+        while queue:
+            x, y = cell = queue.popleft()
+            nextDistance = distances[cell] + 1
+            for neighbor in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                if neighbor not in distances and not walls[neighbor[0]][neighbor[1]]:
+                    distances[neighbor] = nextDistance
+                    queue.append(neighbor)
+        return distances
+
+maxLayouts = 8
+_oracles = collections.OrderedDict()
+_lastOracle = (None, None)
+
+def _layoutKey(walls):
+    "An immutable snapshot of a walls Grid, so later changes to it can not alias."
+    return (walls.width, walls.height, tuple(tuple(column) for column in walls.data))
+
+def getOracle(walls):
+    """
+    Returns the MazeDistanceOracle shared by every caller using this wall
+    layout.  Game states from the same layout share one walls Grid, so the
+    common case is an identity check against the last grid seen.  Only the
+    oracles of the maxLayouts most recently used layouts are kept.
+    """
+    global _lastOracle
+    if _lastOracle[0] is walls:
+        return _lastOracle[1]
+    key = _layoutKey(walls)
+    oracle = _oracles.get(key)
+    if oracle is None:
+        oracle = MazeDistanceOracle(walls)
+        _oracles[key] = oracle
+        if len(_oracles) > maxLayouts:
+            _oracles.popitem(last=False)
+    else:
+        _oracles.move_to_end(key)
+    _lastOracle = (walls, oracle)
+    return oracle
@@ -280,6 +280,183 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class BitGrid:
+    """
+    A drop-in alternative to Grid for boolean data that packs every cell into
+    a single Python int: cell (x,y) is bit x * height + y.  Data is still
+    accessed via grid[x][y].
+
+    Because ints are immutable, copy() is O(1) and copies share storage until
+    one of them is written to (copy-on-write).  __hash__ comes straight from
+    the packed value and equals the hash of an equivalent Grid, count() is a
+    popcount and asList() only visits the set bits.  packBits() produces the
+    same representation as Grid.packBits(), so reconstituteGrid still works.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]: raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = (1 << (width * height)) - 1 if initialValue else 0
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    @staticmethod
+    def fromGrid(grid):
+        "Packs an existing Grid (or BitGrid) into a new BitGrid."
+        if isinstance(grid, BitGrid):
+            return grid.copy()
+        g = BitGrid(grid.width, grid.height)
+        bits = 0
+        base = 1
+        for column in grid.data:
+            for cell in column:
+                if cell:
+                    bits |= base
+                base <<= 1
+        g.bits = bits
+        return g
+
+    def toGrid(self):
+        "Returns an equivalent list-of-lists Grid."
+        g = Grid(self.width, self.height)
+        g.data = self.data
+        return g
+
+    def __getitem__(self, x):
+        if x < 0: x += self.width
+        if not 0 <= x < self.width: raise IndexError('grid index out of range')
+        return _BitGridColumn(self, x)
+
+    def _index(self, x, y):
+        if y < 0: y += self.height
+        if not 0 <= y < self.height: raise IndexError('grid index out of range')
+        return x * self.height + y
+
+    def _get(self, x, y):
+        return (self.bits >> self._index(x, y)) & 1 == 1
+
+    def _set(self, x, y, value):
+        mask = 1 << self._index(x, y)
+        if value:
+            self.bits |= mask
+        else:
+            self.bits &= ~mask
+
+    @property
+    def data(self):
+        "A list-of-lists snapshot of the grid, as stored by Grid."
+        bits, height = self.bits, self.height
+        return [[(bits >> (x * height + y)) & 1 == 1 for y in range(height)] for x in range(self.width)]
+
+    def __str__(self):
+        out = [[str(self._get(x, y))[0] for x in range(self.width)] for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None: return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.width == other.width and self.height == other.height
+        return self.data == other.data
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def copy(self):
+        g = BitGrid(self.width, self.height)
+        g.bits = self.bits
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        # Storage is already shared until written, so this is just a copy.
+        return self.copy()
+
+    def count(self, item =True ):
+        n = bin(self.bits).count('1')
+        if item: return n
+        return self.width * self.height - n
+
+    def asList(self, key = True):
+        bits = self.bits if key else ~self.bits & ((1 << (self.width * self.height)) - 1)
+        list = []
+        while bits:
+            low = bits & -bits
+            list.append(self._cellIndexToPosition(low.bit_length() - 1))
+            bits ^= low
+        return list
+
+    def packBits(self):
+        """
+        Returns an efficient int list representation
+
+        (width, height, bitPackedInts...)
+        """
+        bits = [self.width, self.height]
+        size = self.width * self.height
+        for start in range(0, size - size % self.CELLS_PER_INT, self.CELLS_PER_INT):
+            bits.append(self._packChunk(start, self.CELLS_PER_INT))
+        bits.append(self._packChunk(size - size % self.CELLS_PER_INT, size % self.CELLS_PER_INT))
+        return tuple(bits)
+
+    def _packChunk(self, start, length):
+        # Grid.packBits stores the first cell of each chunk in the highest bit.
+        chunk = (self.bits >> start) & ((1 << length) - 1)
+        packed = 0
+        for i in range(length):
+            if (chunk >> i) & 1:
+                packed |= 1 << (self.CELLS_PER_INT - i - 1)
+        return packed
+
+    def _cellIndexToPosition(self, index):
+        x = index // self.height
+        y = index % self.height
+        return x, y
+
+    def _unpackBits(self, bits):
+        """
+        Fills in data from a bit-level representation
+        """
+        size = self.width * self.height
+        cell = 0
+        data = 0
+        for packed in bits:
+            if packed < 0: raise ValueError("must be a positive integer")
+            for i in range(self.CELLS_PER_INT):
+                if cell == size: break
+                if (packed >> (self.CELLS_PER_INT - i - 1)) & 1:
+                    data |= 1 << cell
+                cell += 1
+        self.bits = data
+
+class _BitGridColumn:
+    "The object returned by BitGrid[x], so that grid[x][y] reads and writes bits."
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.grid._get(self.x, y)
+
+    def __setitem__(self, y, value):
+        self.grid._set(self.x, y, value)
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self.grid._get(self.x, y)
+
+    def count(self, item=True):
+        return sum(1 for cell in self if cell == item)
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -17,6 +17,7 @@ In search.py, you will implement generic search algorithms which are called by
 Pacman agents (in searchAgents.py).
 """
 
+import time
 import util
 
 class SearchProblem:
@@ -27,6 +28,12 @@ class SearchProblem:
     You do not need to change anything in this class, ever.
     """
 
+    # The search functions accumulate the stepCost returned by getSuccessors
+    # to get the cost of a path.  Problems whose path cost is not the sum of
+    # their step costs should set this to False, in which case every path is
+    # priced with getCostOfActions instead (slower, O(depth) per push).
+    additiveCosts = True
+
     def getStartState(self):
         """
         Returns the start state for the search problem.
@@ -72,20 +79,97 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
-def genericSearch(problem, frontier):
-    explored = []
-    frontier.push((problem.getStartState(), []))
-    while(not frontier.isEmpty()):
-        currentNode, actions = frontier.pop()
-        if(currentNode in explored):
+class SearchNode:
+    """
+    A node in the search tree: a state, the action that reached it, a pointer
+    to the parent node and the accumulated path cost g(n).  Storing a parent
+    pointer instead of the whole action list keeps each push O(1); the path is
+    rebuilt only once, when a goal is popped.
+    """
+    __slots__ = ('state', 'action', 'parent', 'cost')
+
+    def __init__(self, state, action=None, parent=None, cost=0):
+        self.state = state
+        self.action = action
+        self.parent = parent
+        self.cost = cost
+
+    def child(self, successor, action, stepCost):
+        return SearchNode(successor, action, self, self.cost + stepCost)
+
+    def replayChild(self, successor, action, problem):
+        "Like child, but prices the new path with problem.getCostOfActions."
+        node = SearchNode(successor, action, self)
+        node.cost = problem.getCostOfActions(node.path())
+        return node
+
+    def path(self):
+        "Returns the list of actions leading from the root to this node."
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+def genericSearch(problem, frontier, priorityFunction=None):
+    """
+    Graph search shared by all of the algorithms below.
+
+    frontier: a Stack, Queue or PriorityQueue of SearchNodes
+    priorityFunction: (node) -> priority, required iff frontier is a
+                      PriorityQueue
+
+    States are closed when they are popped, so the expansion order is the same
+    as the textbook graph search.  The closed set is hashed, so search states
+    must be hashable.
+
+    Path costs are accumulated from step costs unless the problem sets
+    additiveCosts to False.  Expansion count and wall time are left in
+    problem._searchStats (see searchStatsString).
+    """
+    if priorityFunction is None:
+        push = frontier.push
+    else:
+        push = lambda node: frontier.push(node, priorityFunction(node))
+    replay = not getattr(problem, 'additiveCosts', True)
+    explored = set()
+    expanded = 0
+    startTime = time.time()
+    path = []
+    push(SearchNode(problem.getStartState()))
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        if node.state in explored:
             continue
-        explored.append(currentNode)
-        if(problem.isGoalState(currentNode)):
-            return actions
-        for successor, action, successorCost in problem.getSuccessors(currentNode):
-            newActions = actions + [action]
-            frontier.push((successor, newActions))
-    return []
+        explored.add(node.state)
+        if problem.isGoalState(node.state):
+            path = node.path()
+            break
+        expanded += 1
+        for successor, action, stepCost in problem.getSuccessors(node.state):
+            if successor in explored:
+                continue
+            if replay:
+                push(node.replayChild(successor, action, problem))
+            else:
+                push(node.child(successor, action, stepCost))
+    problem._searchStats = {'expanded': expanded, 'time': time.time() - startTime}
+    return path
+
+def searchStatsString(problem):
+    """
+    Summarizes the statistics genericSearch left on problem, e.g.
+    "1024 expanded in 0.05s (20480 expansions/sec)", or None if the problem
+    has not been searched.
+    """
+    stats = getattr(problem, '_searchStats', None)
+    if stats is None:
+        return None
+    elapsed = stats['time']
+    rate = stats['expanded'] / elapsed if elapsed > 0 else float('inf')
+    return '%d expanded in %.2fs (%.0f expansions/sec)' % (stats['expanded'], elapsed, rate)
 
 
 def depthFirstSearch(problem):
@@ -110,20 +194,7 @@ def breadthFirstSearch(problem):
 
 def uniformCostSearch(problem):
     """Search the node of least total cost first."""
-    explored = []
-    frontier = util.PriorityQueue()
-    frontier.push((problem.getStartState(), []), 0)
-    while(not frontier.isEmpty()):
-        currentNode, actions = frontier.pop()
-        if(currentNode in explored):
-            continue
-        explored.append(currentNode)
-        if(problem.isGoalState(currentNode)):
-            return actions
-        for successor, action, successorCost in problem.getSuccessors(currentNode):
-            newActions = actions + [action]
-            frontier.push((successor, newActions), problem.getCostOfActions(newActions))
-    return []
+    return genericSearch(problem, util.PriorityQueue(), lambda node: node.cost)
 
 
 def nullHeuristic(state, problem=None):
@@ -135,20 +206,8 @@ def nullHeuristic(state, problem=None):
 
 def aStarSearch(problem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost and heuristic first."""
-    explored = []
-    frontier = util.PriorityQueue()
-    frontier.push((problem.getStartState(), []), heuristic(problem.getStartState(), problem))
-    while(not frontier.isEmpty()):
-        currentNode, actions = frontier.pop()
-        if(currentNode in explored):
-            continue
-        explored.append(currentNode)
-        if(problem.isGoalState(currentNode)):
-            return actions
-        for successor, action, successorCost in problem.getSuccessors(currentNode):
-            newActions = actions + [action]
-            frontier.push((successor, newActions), problem.getCostOfActions(newActions) + heuristic(successor, problem))
-    return []
+    return genericSearch(problem, util.PriorityQueue(),
+                         lambda node: node.cost + heuristic(node.state, problem))
 
 
 # Abbreviations
@@ -37,9 +37,11 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitGrid
 import util
 import time
 import search
+import distanceOracle
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -116,6 +118,8 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        stats = search.searchStatsString(problem)
+        if stats is not None: print('Search engine: %s' % stats)
 
     def getAction(self, state):
         """
@@ -293,7 +297,7 @@ class CornersProblem(search.SearchProblem):
         Returns the start state (in your state space, not the full Pacman state
         space)
         """
-        visited = []
+        visited = ()
         return (self.startingPosition, visited)
 
     def isGoalState(self, state):
@@ -325,7 +329,7 @@ class CornersProblem(search.SearchProblem):
             if not hitsWall:
                 nextPos = (nextx, nexty)
                 if nextPos in self.corners and nextPos not in visited:
-                    newVisited = visited + [nextPos]
+                    newVisited = visited + (nextPos,)
                     successors.append(((nextPos, newVisited), action, 1))
                 else:
                     successors.append(((nextPos, visited), action, 1))
@@ -387,14 +391,18 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a BitGrid (see game.py) of either True or False, specifying remaining food
+
+    The food is packed into a BitGrid so that copying it for every successor
+    and hashing it for the closed set are both O(1).
     """
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        self.start = (startingGameState.getPacmanPosition(), BitGrid.fromGrid(startingGameState.getFood()))
         self.walls = startingGameState.getWalls()
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
+        self.distances = distanceOracle.getOracle(self.walls) # Shared maze distances for this layout
 
     def getStartState(self):
         return self.start
@@ -455,7 +463,7 @@ def foodHeuristic(state, problem):
 
     If you want access to info like walls, capsules, etc., you can query the
     problem.  For example, problem.walls gives you a Grid of where the walls
-    are.
+    are, and problem.distances.getMazeDistance(p1, p2) gives cached maze distances.
 
     If you want to *store* information to be reused in other calls to the
     heuristic, there is a dictionary called problem.heuristicInfo that you can
@@ -470,7 +478,7 @@ def foodHeuristic(state, problem):
     if not foodList:
         return 0
     dist, maxNode = max([(util.manhattanDistance(position, food), food) for food in foodList])
-    heuristic = mazeDistance(position, maxNode, problem.startingGameState)
+    heuristic = problem.distances.getMazeDistance(position, maxNode)
     return heuristic
 
 class ClosestDotSearchAgent(SearchAgent):
@@ -501,22 +509,7 @@ class ClosestDotSearchAgent(SearchAgent):
         walls = gameState.getWalls()
         problem = AnyFoodSearchProblem(gameState)
 
-        explored = []
-        actions = []
-        initial = problem.getStartState()
-        frontier = util.Queue()
-
-        frontier.push((initial, actions))
-
-        while not frontier.isEmpty():
-            node, actions = frontier.pop()
-            if node in explored:
-                continue
-            explored.append(node)
-            if problem.isGoalState(node):
-                return actions
-            for successor, action, cost in problem.getSuccessors(node):
-                frontier.push((successor, actions + [action]))
+        return search.bfs(problem)
 
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
@@ -543,19 +536,23 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self.distances = distanceOracle.getOracle(self.walls) # Shared maze distances for this layout
 
     def isGoalState(self, state):
         """
         The state is Pacman's position. Fill this in with a goal test that will
         complete the problem definition.
         """
-        return state in self.food.asList()
+        x, y = state
+        return self.food[x][y]
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- Pacman's
-    position in that state is ignored.
+    Returns the maze distance between any two points. The gameState can be any
+    game state -- Pacman's position in that state is ignored.
+
+    Distances come from the oracle shared by every caller on this layout (see
+    distanceOracle.py), so only the first query from a cell runs a BFS.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
@@ -566,5 +563,4 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return distanceOracle.getOracle(walls).getMazeDistance(point1, point2)
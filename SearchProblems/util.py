@@ -173,38 +173,116 @@ class PriorityQueue:
       has a priority associated with it and the client is usually interested
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
+
+      push and pop are plain heap operations.  The first call to update or
+      a membership test builds an entry finder mapping each queued item to
+      its heap entry; from then on update marks the old entry as removed
+      instead of scanning and re-heapifying, and pop skips removed entries.
+      A queue holding items that are not hashable falls back to scanning
+      the heap in update and membership tests.
     """
     def  __init__(self):
         self.heap = []
         self.count = 0
+        self.size = 0
+        # Built when update or a membership test first needs it, and dropped
+        # for good once an unhashable item is queued
+        self.entryFinder = None
+        self.hashable = True
 
     def push(self, item, priority):
-        entry = (priority, self.count, item)
+        entry = [priority, self.count, item, True]
         heapq.heappush(self.heap, entry)
         self.count += 1
+        self.size += 1
+        if self.entryFinder is not None:
+            try:
+                self.entryFinder[item] = entry
+            except TypeError:
+                self.dropEntryFinder()
 
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
+        entry = heapq.heappop(self.heap)
+        while not entry[3]:
+            entry = heapq.heappop(self.heap)
+        self.size -= 1
+        item = entry[2]
+        if self.entryFinder is not None and self.entryFinder.get(item) is entry:
+            del self.entryFinder[item]
         return item
 
     def isEmpty(self):
-        return len(self.heap) == 0
+        return self.size == 0
+
+    def buildEntryFinder(self):
+        "Indexes the live heap entries, keeping the most recent entry of each item."
+        self.entryFinder = {}
+        try:
+            for entry in self.heap:
+                if entry[3]:
+                    current = self.entryFinder.get(entry[2])
+                    if current is None or current[1] < entry[1]:
+                        self.entryFinder[entry[2]] = entry
+        except TypeError:
+            self.dropEntryFinder()
+
+    def dropEntryFinder(self):
+        self.entryFinder = None
+        self.hashable = False
+
+    def indexable(self, item):
+        "Returns whether update and membership tests can use the entry finder for item."
+        if self.entryFinder is None and self.hashable:
+            self.buildEntryFinder()
+        if self.hashable:
+            try:
+                hash(item)
+                return True
+            except TypeError:
+                self.dropEntryFinder()
+        return False
 
     def update(self, item, priority):
-        # If item already in priority queue with higher priority, update its priority and rebuild the heap.
+        # If item already in priority queue with higher priority, update its priority.
         # If item already in priority queue with equal or lower priority, do nothing.
         # If item not in priority queue, do the same thing as self.push.
-        for index, (p, c, i) in enumerate(self.heap):
-            if i == item:
-                if p <= priority:
+        # (If item was pushed more than once, its most recent entry is the one considered.)
+        if not self.indexable(item):
+            self.updateByScan(item, priority)
+            return
+        entry = self.entryFinder.get(item)
+        if entry is None:
+            self.push(item, priority)
+            return
+        if entry[0] <= priority:
+            return
+        # Keep the original insertion count so ties still break by age.
+        entry[3] = False
+        newEntry = [priority, entry[1], item, True]
+        heapq.heappush(self.heap, newEntry)
+        self.entryFinder[item] = newEntry
+
+    def updateByScan(self, item, priority):
+        "Update for queues holding unhashable items, scanning the heap."
+        for index, entry in enumerate(self.heap):
+            if entry[3] and entry[2] == item:
+                if entry[0] <= priority:
                     break
                 del self.heap[index]
-                self.heap.append((priority, c, item))
+                self.heap.append([priority, entry[1], item, True])
                 heapq.heapify(self.heap)
                 break
         else:
             self.push(item, priority)
 
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, item):
+        if self.indexable(item):
+            return item in self.entryFinder
+        return any(entry[3] and entry[2] == item for entry in self.heap)
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the